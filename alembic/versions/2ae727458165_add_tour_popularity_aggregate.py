@@ -0,0 +1,64 @@
+"""Add tour_popularity aggregate
+
+Revision ID: 2ae727458165
+Revises: a05d0a67e18b
+Create Date: 2026-10-17 11:48:09.562730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2ae727458165'
+down_revision: Union[str, None] = 'a05d0a67e18b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tour_popularity',
+        sa.Column('tour_id', sa.Integer(), nullable=False),
+        sa.Column('requests_count', sa.Integer(), nullable=False),
+        sa.Column('pending_count', sa.Integer(), nullable=False),
+        sa.Column('approved_count', sa.Integer(), nullable=False),
+        sa.Column('rejected_count', sa.Integer(), nullable=False),
+        sa.Column('cancelled_count', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('last_request_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tour_id'], ['tours.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('tour_id')
+    )
+    op.create_index(
+        'ix_tour_popularity_score_tour_id', 'tour_popularity',
+        [sa.text('score DESC'), 'tour_id'],
+        unique=False
+    )
+
+    # Заполняем агрегат по уже существующим заявкам
+    # (эпоха и период удвоения как в app/db/popularity.py)
+    op.execute("""
+        INSERT INTO tour_popularity (
+            tour_id, requests_count, pending_count, approved_count,
+            rejected_count, cancelled_count, score, last_request_at
+        )
+        SELECT
+            tour_id,
+            count(*),
+            count(*) FILTER (WHERE status = 'pending'),
+            count(*) FILTER (WHERE status = 'approved'),
+            count(*) FILTER (WHERE status = 'rejected'),
+            count(*) FILTER (WHERE status = 'cancelled'),
+            coalesce(sum(power(2.0, extract(epoch FROM (created_at - timestamp '2025-01-01')) / (14 * 86400))), 0),
+            max(created_at)
+        FROM travel_requests
+        WHERE tour_id IS NOT NULL
+        GROUP BY tour_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tour_popularity_score_tour_id', table_name='tour_popularity')
+    op.drop_table('tour_popularity')
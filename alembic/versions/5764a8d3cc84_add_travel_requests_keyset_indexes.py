@@ -0,0 +1,28 @@
+"""Add travel_requests keyset pagination indexes
+
+Revision ID: 5764a8d3cc84
+Revises: c2500936315a
+Create Date: 2026-10-17 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5764a8d3cc84'
+down_revision: Union[str, None] = 'c2500936315a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_travel_requests_created_at_id', 'travel_requests', ['created_at', 'id'], unique=False)
+    op.create_index('ix_travel_requests_user_id_created_at_id', 'travel_requests', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_travel_requests_user_id_created_at_id', table_name='travel_requests')
+    op.drop_index('ix_travel_requests_created_at_id', table_name='travel_requests')
@@ -0,0 +1,33 @@
+"""Add payload to notification_outbox for batch summaries
+
+Revision ID: 9b2f4e7c1d3a
+Revises: f4da697235d9
+Create Date: 2026-10-17 13:05:18.402736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2f4e7c1d3a'
+down_revision: Union[str, None] = 'f4da697235d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notification_outbox', sa.Column('payload', sa.JSON(), nullable=True))
+    op.alter_column('notification_outbox', 'request_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM notification_outbox WHERE request_id IS NULL")
+    op.alter_column('notification_outbox', 'request_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+    op.drop_column('notification_outbox', 'payload')
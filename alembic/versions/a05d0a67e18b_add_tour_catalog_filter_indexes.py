@@ -0,0 +1,46 @@
+"""Add tour catalog filter and sort indexes
+
+Revision ID: a05d0a67e18b
+Revises: 5764a8d3cc84
+Create Date: 2026-10-17 11:03:27.905114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a05d0a67e18b'
+down_revision: Union[str, None] = '5764a8d3cc84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_tours_location_price_id', 'tours', ['location', 'price', 'id'], unique=False)
+    op.create_index('ix_tours_price_id', 'tours', ['price', 'id'], unique=False)
+    op.create_index('ix_tours_departure_date_id', 'tours', ['departure_date', 'id'], unique=False)
+    op.create_index('ix_tours_duration_id', 'tours', ['duration', 'id'], unique=False)
+    op.create_index('ix_tours_is_hot_departure_date', 'tours', ['is_hot', 'departure_date'], unique=False)
+    op.create_index(
+        'ix_tours_price_desc_id', 'tours',
+        [sa.text('price DESC NULLS LAST'), sa.text('id DESC')],
+        unique=False
+    )
+    op.create_index(
+        'ix_tours_rating_desc_id', 'tours',
+        [sa.text('rating DESC NULLS LAST'), sa.text('id DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tours_rating_desc_id', table_name='tours')
+    op.drop_index('ix_tours_price_desc_id', table_name='tours')
+    op.drop_index('ix_tours_is_hot_departure_date', table_name='tours')
+    op.drop_index('ix_tours_duration_id', table_name='tours')
+    op.drop_index('ix_tours_departure_date_id', table_name='tours')
+    op.drop_index('ix_tours_price_id', table_name='tours')
+    op.drop_index('ix_tours_location_price_id', table_name='tours')
@@ -5,10 +5,12 @@ from fastapi import FastAPI, Depends, Request, Response
 from app.db.models import Tour, User, TravelRequest
 from app.db.database import engine
 from app.api.endpoints.auth import get_current_user
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from app.db.database import AsyncSessionLocal
 from typing import Optional, List
-from app.core.security import verify_password
+from app.core.security import check_password
+from app.core.cache import invalidate_tour
+from app.core.principals import invalidate_principals, load_principal
 from datetime import datetime
 
 def format_datetime(value):
@@ -33,10 +35,17 @@ class AdminAuth:
         email, password = form.get("username"), form.get("password")
         
         try:
-            db: Session = next(get_db())
-            user = db.query(User).filter(User.email == email).first()
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(User).filter(User.email == email))
+                user = result.scalars().first()
+                if not (user and user.is_admin):
+                    return False
+                verified, new_hash = await check_password(password, user.hashed_password)
+                if verified and new_hash:
+                    user.hashed_password = new_hash
+                    await db.commit()
             
-            if user and user.is_admin and verify_password(password, user.hashed_password):
+            if verified:
                 request.session["admin-auth"] = email
                 return True
         except:
@@ -53,9 +62,9 @@ class AdminAuth:
             return False
         
         try:
-            db: Session = next(get_db())
-            user = db.query(User).filter(User.email == email).first()
-            return bool(user and user.is_admin)
+            async with AsyncSessionLocal() as db:
+                principal = await load_principal(db, email)
+            return bool(principal and principal["is_admin"])
         except:
             return False
 
@@ -105,6 +114,12 @@ class TourAdmin(ModelView, model=Tour):
         Tour.rating: lambda m, a: f"{m.rating:.1f}" if m.rating else "Нет оценок"
     }
 
+    async def after_model_change(self, data, model, is_created, request) -> None:
+        await invalidate_tour(model.id)
+
+    async def after_model_delete(self, model, request) -> None:
+        await invalidate_tour(model.id)
+
 class UserAdmin(ModelView, model=User):
     name = "Пользователь"
     name_plural = "Пользователи"
@@ -130,6 +145,13 @@ class UserAdmin(ModelView, model=User):
         User.created_at: lambda m, a: format_datetime(m.created_at)
     }
 
+    # Права и активность пользователя кэшируются для авторизации
+    async def after_model_change(self, data, model, is_created, request) -> None:
+        await invalidate_principals()
+
+    async def after_model_delete(self, model, request) -> None:
+        await invalidate_principals()
+
 class TravelRequestAdmin(ModelView, model=TravelRequest):
     name = "Заявка"
     name_plural = "Заявки"
@@ -1,5 +1,13 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import func, select
 from app.api.endpoints import auth, tours, requests
+from app.api.endpoints.auth import get_current_admin_user, get_current_user
+from app.core.config import settings
+from app.core.profiling import recent_profiles
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal, async_engine, engine
+from app.db.models import NotificationOutbox, User
+from app.db.pool import pool_stats
 
 api_router = APIRouter()
 
@@ -9,4 +17,50 @@ api_router.include_router(requests.router, prefix="/requests", tags=["requests"]
 
 @api_router.get("/health")
 async def health_check():
-    return {"status": "ok"} 
\ No newline at end of file
+    return {"status": "ok"}
+
+@api_router.get("/health/db-pool")
+async def db_pool_stats(current_user: User = Depends(get_current_admin_user)):
+    return {
+        "async": pool_stats(async_engine.sync_engine.pool),
+        "sync": pool_stats(engine.pool),
+    }
+
+@api_router.get("/metrics")
+async def metrics_endpoint():
+    """Метрики процесса в текстовом формате Prometheus"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(NotificationOutbox.status, func.count())
+            .filter(NotificationOutbox.status != "sent")
+            .group_by(NotificationOutbox.status)
+        )
+        outbox = {status: count for status, count in result.all()}
+    pools = {"async": pool_stats(async_engine.sync_engine.pool), "sync": pool_stats(engine.pool)}
+    gauges = {
+        "notification_outbox_messages": (
+            "Notification outbox rows waiting for delivery or given up",
+            {(("status", status),): outbox.get(status, 0) for status in ("pending", "dead")}
+        ),
+        "db_pool_checked_out": (
+            "Connections checked out of the pool",
+            {(("engine", name),): stats.get("checked_out", 0) for name, stats in pools.items()}
+        ),
+    }
+    return Response(content=metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/debug/sql-profiles")
+async def sql_profiles(current_user: User = Depends(get_current_user)):
+    """Последние профили запросов к базе: повторяющиеся (N+1) и медленные запросы"""
+    if not settings.sql_profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="SQL profiling is disabled"
+        )
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return list(reversed(recent_profiles))
+
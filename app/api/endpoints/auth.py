@@ -1,19 +1,24 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 from app.core import security
 from app.core.config import settings
+from app.core.principals import load_principal, principal_claims, principal_user
 from app.db.database import get_db
 from app.db import models
 from app.schemas import schemas
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", scheme_name="email")
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> models.User:
     credentials_exception = HTTPException(
@@ -22,22 +27,35 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = security.jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = security.decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if user is None:
+    if settings.auth_trust_token_claims and "uid" in payload and "adm" in payload:
+        # Права берутся из подписанного токена, без обращения к базе
+        return models.User(id=payload["uid"], email=email, is_admin=payload["adm"], is_active=True)
+    principal = await load_principal(db, email)
+    if principal is None:
         raise credentials_exception
-    return user
+    return principal_user(principal)
+
+async def get_current_admin_user(
+    current_user: models.User = Depends(get_current_user)
+) -> models.User:
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
 
 @router.post("/login", response_model=schemas.Token)
 async def login(
     login_data: schemas.LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Login endpoint that accepts email and password.
@@ -50,44 +68,45 @@ async def login(
     - access_token: JWT token for authentication
     - token_type: Type of token (always "bearer")
     """
-    print(f"Login attempt with email: {login_data.email}")
-    
     # Ищем пользователя только по email
-    user = db.query(models.User).filter(models.User.email == login_data.email).first()
+    result = await db.execute(select(models.User).filter(models.User.email == login_data.email))
+    user = result.scalars().first()
     
-    if not user or not security.verify_password(login_data.password, user.hashed_password):
-        print("Login failed: incorrect credentials")
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await security.check_password(login_data.password, user.hashed_password)
+    if not verified:
+        logger.info("Login failed for %s", login_data.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    print(f"Login successful for user: {user.username}")
+    if new_hash:
+        # Параметры bcrypt изменились — сохраняем пересчитанный хэш
+        user.hashed_password = new_hash
+        await db.commit()
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user.email},
+        data=principal_claims(user),
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.Token)
-async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    print(f"Received registration request for user: {user.username}, email: {user.email}")
-    
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем только уникальность email
-    db_user_email = db.query(models.User).filter(models.User.email == user.email).first()
+    result = await db.execute(select(models.User).filter(models.User.email == user.email))
+    db_user_email = result.scalars().first()
     
     if db_user_email:
-        print(f"Email {user.email} already exists")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    print("Creating new user...")
-    hashed_password = security.get_password_hash(user.password)
-    print(f"Password hashed successfully: {hashed_password[:10]}...")
+    hashed_password = await security.hash_password(user.password)
     
     db_user = models.User(
         username=user.username,
@@ -95,32 +114,25 @@ async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password,
         is_admin=user.is_admin
     )
-    print("User model created")
     
     db.add(db_user)
-    print("User added to session")
     
     try:
-        db.commit()
-        print("User committed to database")
+        await db.commit()
     except Exception as e:
-        print(f"Error committing to database: {str(e)}")
-        db.rollback()
+        logger.error("Error creating user %s: %s", user.email, e)
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error creating user in database"
         )
     
-    db.refresh(db_user)
-    print("User refreshed from database")
+    await db.refresh(db_user)
     
-    print("Generating access token...")
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": db_user.email},  # Используем email вместо username
+        data=principal_claims(db_user),  # subject — email, а не username
         expires_delta=access_token_expires
     )
-    print("Access token generated successfully")
-    
-    print("User created successfully")
+    logger.info("User %s registered", db_user.id)
     return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
@@ -1,22 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime
+from app.db.database import AsyncSessionLocal, get_db
 from app.db import models
+from app.db.queries import request_with_tour_and_user, requests_with_tour_and_user
 from app.schemas import schemas
 from app.api.endpoints.auth import get_current_user
-from app.bot.notifications import send_group_notification
-import asyncio
+from app.api.pagination import decode_cursor, encode_cursor
+from app.api.transfer import EXPORT_CHUNK_ROWS, EXPORT_MEDIA_TYPES, detect_format, stream_rows
+from app.bot.config import settings as bot_settings
+from app.core.cache import invalidate_tour
+from app.db.popularity import record_request_created, record_status_change, record_status_changes
+from app.db.reservations import SEAT_HOLDING_STATUSES, apply_seat_deltas, apply_status_transition, available_spots, seat_deltas
+from app.db.outbox import enqueue_batch_notification, enqueue_request_notification
 
 router = APIRouter()
 
+REQUEST_STATUSES = ["pending", "approved", "rejected", "cancelled"]
+MAX_BATCH_SIZE = 500
+
+# Колонки выгрузки заявок для отчётов
+REQUEST_EXPORT_COLUMNS = {
+    "id": models.TravelRequest.id,
+    "status": models.TravelRequest.status,
+    "created_at": models.TravelRequest.created_at,
+    "updated_at": models.TravelRequest.updated_at,
+    "tour_id": models.TravelRequest.tour_id,
+    "tour_title": models.Tour.title,
+    "user_id": models.TravelRequest.user_id,
+    "username": models.User.username,
+    "guest_name": models.TravelRequest.guest_name,
+    "guest_email": models.TravelRequest.guest_email,
+    "guest_phone": models.TravelRequest.guest_phone,
+    "comment": models.TravelRequest.comment,
+}
+
+async def get_request_detail(db: AsyncSession, request_id: int) -> models.TravelRequest:
+    """Заявка с уже загруженными туром и пользователем"""
+    result = await db.execute(request_with_tour_and_user(request_id))
+    return result.scalars().first()
+
+async def paginate_requests(db: AsyncSession, query, cursor: Optional[str], limit: int) -> schemas.TravelRequestPage:
+    """Страница заявок от новых к старым по ключу (created_at, id)"""
+    position = decode_cursor(cursor, "created_at", "id")
+    if position:
+        query = query.filter(
+            tuple_(models.TravelRequest.created_at, models.TravelRequest.id)
+            < tuple_(position["created_at"], position["id"])
+        )
+    query = query.order_by(
+        models.TravelRequest.created_at.desc(),
+        models.TravelRequest.id.desc()
+    ).limit(limit + 1)
+    result = await db.execute(query)
+    requests = result.scalars().all()
+    next_cursor = None
+    if len(requests) > limit:
+        requests = requests[:limit]
+        last = requests[-1]
+        next_cursor = encode_cursor(created_at=last.created_at, id=last.id)
+    return schemas.TravelRequestPage(
+        items=[schemas.TravelRequestDetail.from_orm(request) for request in requests],
+        next_cursor=next_cursor
+    )
+
 @router.post("/guest", response_model=schemas.TravelRequest)
 async def create_guest_request(
     request: schemas.GuestTravelRequestCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     # Проверяем существование тура
-    tour = db.query(models.Tour).filter(models.Tour.id == request.tour_id).first()
+    tour = await db.get(models.Tour, request.tour_id)
     if tour is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,22 +97,23 @@ async def create_guest_request(
         comment=request.comment
     )
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
-    
-    # Отправляем уведомление
-    asyncio.create_task(send_group_notification(db_request))
+    await db.flush()
+    await record_request_created(db, request.tour_id)
+    # Уведомление попадает в outbox в той же транзакции, что и заявка
+    await enqueue_request_notification(db, db_request.id, "created", bot_settings.ADMIN_IDS)
+    await db.commit()
+    db_request = await get_request_detail(db, db_request.id)
     
     return db_request
 
 @router.post("/", response_model=schemas.TravelRequest)
 async def create_request(
     request: schemas.TravelRequestCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     # Проверяем существование тура
-    tour = db.query(models.Tour).filter(models.Tour.id == request.tour_id).first()
+    tour = await db.get(models.Tour, request.tour_id)
     if tour is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,27 +134,32 @@ async def create_request(
         status="pending"
     )
     db.add(db_request)
-    db.commit()
-    db.refresh(db_request)
-    
-    # Отправляем уведомление
-    asyncio.create_task(send_group_notification(db_request))
+    await db.flush()
+    await record_request_created(db, request.tour_id)
+    # Уведомление попадает в outbox в той же транзакции, что и заявка
+    await enqueue_request_notification(db, db_request.id, "created", bot_settings.ADMIN_IDS)
+    await db.commit()
+    db_request = await get_request_detail(db, db_request.id)
     
     return db_request
 
-@router.get("/my", response_model=List[schemas.TravelRequest])
-def get_my_requests(
-    db: Session = Depends(get_db),
+@router.get("/my", response_model=schemas.TravelRequestPage)
+async def get_my_requests(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    requests = db.query(models.TravelRequest).filter(
+    query = requests_with_tour_and_user().filter(
         models.TravelRequest.user_id == current_user.id
-    ).all()
-    return requests
+    )
+    return await paginate_requests(db, query, cursor, limit)
 
-@router.get("/", response_model=List[schemas.TravelRequest])
-def get_all_requests(
-    db: Session = Depends(get_db),
+@router.get("/", response_model=schemas.TravelRequestPage)
+async def get_all_requests(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
@@ -104,14 +167,82 @@ def get_all_requests(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    requests = db.query(models.TravelRequest).all()
-    return requests
+    return await paginate_requests(db, requests_with_tour_and_user(), cursor, limit)
+
+@router.get("/export")
+async def export_requests(
+    fmt: str = Query("jsonl", alias="format"),
+    request_status: Optional[str] = Query(None, alias="status"),
+    tour_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Потоковая выгрузка заявок в JSONL или CSV (серверный курсор, без загрузки всего в память)"""
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    fmt = detect_format(fmt)
+    if request_status is not None and request_status not in REQUEST_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid status"
+        )
+
+    query = (
+        select(*(column.label(name) for name, column in REQUEST_EXPORT_COLUMNS.items()))
+        .join(models.Tour, models.Tour.id == models.TravelRequest.tour_id)
+        .outerjoin(models.User, models.User.id == models.TravelRequest.user_id)
+    )
+    if request_status is not None:
+        query = query.filter(models.TravelRequest.status == request_status)
+    if tour_id is not None:
+        query = query.filter(models.TravelRequest.tour_id == tour_id)
+    if created_from is not None:
+        query = query.filter(models.TravelRequest.created_at >= created_from)
+    if created_to is not None:
+        query = query.filter(models.TravelRequest.created_at < created_to)
+    query = query.order_by(models.TravelRequest.created_at, models.TravelRequest.id)
+
+    async def rows():
+        # Своя сессия: зависимость get_db закрывается до отправки тела ответа
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+            async for row in result.mappings():
+                yield dict(row)
+
+    return StreamingResponse(
+        stream_rows(rows(), fmt, list(REQUEST_EXPORT_COLUMNS)),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="requests.{fmt}"'}
+    )
+
+@router.get("/{request_id}", response_model=schemas.TravelRequestDetail)
+async def get_request(
+    request_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    db_request = await get_request_detail(db, request_id)
+    if db_request is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Request not found"
+        )
+    if not current_user.is_admin and db_request.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return db_request
 
 @router.put("/{request_id}/status", response_model=schemas.TravelRequest)
-def update_request_status(
+async def update_request_status(
     request_id: int,
-    status: str,
-    db: Session = Depends(get_db),
+    new_status: str = Query(..., alias="status"),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
@@ -120,36 +251,148 @@ def update_request_status(
             detail="Not enough permissions"
         )
     
-    db_request = db.query(models.TravelRequest).filter(
-        models.TravelRequest.id == request_id
-    ).first()
+    if new_status not in REQUEST_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid status"
+        )
+    
+    # Блокируем заявку, чтобы параллельная смена статуса не заняла место дважды
+    result = await db.execute(
+        select(models.TravelRequest)
+        .filter(models.TravelRequest.id == request_id)
+        .with_for_update()
+    )
+    db_request = result.scalars().first()
     if db_request is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Request not found"
         )
     
-    if status not in ["pending", "approved", "rejected", "cancelled"]:
+    old_status = db_request.status
+    if not await apply_status_transition(db, db_request.tour_id, old_status, new_status):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid status"
+            detail="No available spots for this tour"
         )
+    await record_status_change(db, db_request.tour_id, old_status, new_status)
+    db_request.status = new_status
+    if old_status != new_status:
+        await enqueue_request_notification(db, db_request.id, "status_changed", bot_settings.ADMIN_IDS)
     
-    db_request.status = status
-    if status == "approved":
-        # Уменьшаем количество доступных мест
-        tour = db_request.tour
-        if tour.available_spots > 0:
-            tour.available_spots -= 1
-        else:
+    await db.commit()
+    if old_status != new_status:
+        await invalidate_tour(db_request.tour_id)
+    db_request = await get_request_detail(db, db_request.id)
+    
+    return db_request
+
+@router.post("/status:batch", response_model=schemas.RequestStatusBatchResult)
+async def update_request_statuses(
+    batch: schemas.RequestStatusBatch,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Меняет статусы многих заявок в одной транзакции.
+
+    Места считаются по турам сразу для всей пачки: если на все одобрения
+    в туре мест не хватает, одобряются первые по id заявки, пока есть
+    места, остальные попадают в failed. Администраторы получают одно
+    сводное уведомление на пачку.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    if len(batch.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items, maximum is {MAX_BATCH_SIZE}"
+        )
+    changes = {}
+    for item in batch.items:
+        if item.status not in REQUEST_STATUSES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No available spots for this tour"
+                detail=f"Invalid status for request {item.request_id}"
             )
-    
-    db.commit()
-    
-    # Отправляем уведомление
-    asyncio.create_task(send_group_notification(db_request))
-    
-    return db_request 
\ No newline at end of file
+        if item.request_id in changes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Duplicate request {item.request_id}"
+            )
+        changes[item.request_id] = item.status
+
+    # Блокируем все заявки пачки в одном порядке, чтобы параллельные пачки не взаимоблокировались
+    result = await db.execute(
+        select(models.TravelRequest)
+        .filter(models.TravelRequest.id.in_(changes))
+        .order_by(models.TravelRequest.id)
+        .with_for_update()
+    )
+    db_requests = result.scalars().all()
+    found = {db_request.id for db_request in db_requests}
+    failed = [
+        schemas.RequestStatusFailure(request_id=request_id, detail="Request not found")
+        for request_id in changes if request_id not in found
+    ]
+
+    transitions = [
+        (db_request, db_request.status, changes[db_request.id])
+        for db_request in db_requests
+    ]
+    deltas = seat_deltas((r.tour_id, old, new) for r, old, new in transitions)
+    applied_tours = await apply_seat_deltas(db, deltas)
+
+    rejected_tours = set(deltas) - applied_tours
+    if rejected_tours:
+        # Мест на все одобрения не хватило: одобряем по порядку id заявок, пока
+        # хватает свободных и возвращённых этой же пачкой мест, остальные отклоняем
+        free = await available_spots(db, rejected_tours)
+        for db_request, old_status, new_status in transitions:
+            if (
+                db_request.tour_id in rejected_tours
+                and old_status in SEAT_HOLDING_STATUSES
+                and new_status not in SEAT_HOLDING_STATUSES
+            ):
+                free[db_request.tour_id] += 1
+        kept = []
+        for db_request, old_status, new_status in transitions:
+            if (
+                db_request.tour_id in rejected_tours
+                and new_status in SEAT_HOLDING_STATUSES
+                and old_status not in SEAT_HOLDING_STATUSES
+            ):
+                if free[db_request.tour_id] <= 0:
+                    failed.append(schemas.RequestStatusFailure(
+                        request_id=db_request.id,
+                        detail="No available spots for this tour"
+                    ))
+                    continue
+                free[db_request.tour_id] -= 1
+            kept.append((db_request, old_status, new_status))
+        transitions = kept
+        await apply_seat_deltas(db, seat_deltas(
+            (r.tour_id, old, new) for r, old, new in transitions if r.tour_id in rejected_tours
+        ))
+
+    await record_status_changes(db, [(r.tour_id, old, new) for r, old, new in transitions])
+    summary = {}
+    for db_request, old_status, new_status in transitions:
+        db_request.status = new_status
+        if old_status != new_status:
+            summary.setdefault(new_status, []).append(db_request.id)
+    if summary:
+        # Одно сводное уведомление на пачку вместо сообщения на каждую заявку
+        await enqueue_batch_notification(db, summary, bot_settings.ADMIN_IDS)
+
+    await db.commit()
+    for tour_id in {r.tour_id for r, old, new in transitions if old != new}:
+        await invalidate_tour(tour_id)
+
+    return schemas.RequestStatusBatchResult(
+        updated=[schemas.TravelRequest.from_orm(db_request) for db_request, _, _ in transitions],
+        failed=failed
+    )
@@ -1,55 +1,373 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import get_db
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from itertools import islice
+from app.db.database import AsyncSessionLocal, get_db
 from app.db import models
+from app.db.tour_import import IMPORT_BATCH_SIZE, sync_tour_id_sequence, upsert_tours
 from app.schemas import schemas
 from app.api.endpoints.auth import get_current_user
+from app.api.pagination import decode_cursor, encode_cursor
+from app.api.transfer import EXPORT_CHUNK_ROWS, EXPORT_MEDIA_TYPES, detect_format, iter_csv, iter_jsonl, stream_rows
+from app.core.cache import invalidate_all_tours, invalidate_tour, tour_cache, tour_key, tour_list_key
+import codecs
+import csv
+import json
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.Tour])
-def get_tours(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+def render_json(data) -> bytes:
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False).encode("utf-8")
+
+def render_tours(tours) -> bytes:
+    return render_json([schemas.Tour.from_orm(tour) for tour in tours])
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+# Допустимые ключи сортировки каталога: колонка и направление (по убыванию?)
+TOUR_SORTS = {
+    "id": (models.Tour.id, False),
+    "price": (models.Tour.price, False),
+    "-price": (models.Tour.price, True),
+    "departure_date": (models.Tour.departure_date, False),
+    "duration": (models.Tour.duration, False),
+    "-rating": (models.Tour.rating, True),
+}
+
+def _int_value(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("expected an integer")
+    return value
+
+def _number_value(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("expected a number")
+    return value
+
+def _datetime_value(value):
+    if not isinstance(value, str):
+        raise ValueError("expected a datetime string")
+    return datetime.fromisoformat(value)
+
+# Проверка и разбор значения сортировки из курсора для каждого ключа
+TOUR_SORT_VALUES = {
+    "id": _int_value,
+    "price": _number_value,
+    "-price": _number_value,
+    "departure_date": _datetime_value,
+    "duration": _int_value,
+    "-rating": _number_value,
+}
+
+def decode_tour_cursor(cursor: Optional[str], sort: str) -> Optional[dict]:
+    """Позиция из курсора; курсор другой сортировки или со значением не того типа — 400"""
+    position = decode_cursor(cursor, "sort", "value", "id")
+    if not position:
+        return None
+    try:
+        if position["sort"] != sort:
+            raise ValueError("cursor was issued for another sort")
+        if position["value"] is not None:
+            position["value"] = TOUR_SORT_VALUES[sort](position["value"])
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return position
+
+def encode_tour_cursor(sort: str, tour: models.Tour) -> str:
+    column, _ = TOUR_SORTS[sort]
+    return encode_cursor(sort=sort, value=getattr(tour, column.key), id=tour.id)
+
+async def fetch_sorted_tours(db: AsyncSession, query, sort: str, cursor: Optional[str], count: int) -> list:
+    """До count туров после курсора: по ключу с id как вторым ключом, пустые значения в конце.
+
+    Туры со значением и хвост без значения читаются отдельными запросами,
+    чтобы переход за курсор был условием (значение, id) > (v, x) — диапазоном
+    индекса (column, id), а не фильтром с OR.
+    """
+    column, descending = TOUR_SORTS[sort]
+    tour_id = models.Tour.id
+    position = decode_tour_cursor(cursor, sort)
+    if column is tour_id:
+        if position:
+            query = query.filter(tour_id > position["id"])
+        result = await db.execute(query.order_by(tour_id).limit(count))
+        return list(result.scalars().all())
+
+    tours = []
+    if position is None or position["value"] is not None:
+        valued = query.filter(column.isnot(None))
+        if position:
+            key, after = tuple_(column, tour_id), tuple_(position["value"], position["id"])
+            valued = valued.filter(key < after if descending else key > after)
+        if descending:
+            valued = valued.order_by(column.desc().nulls_last(), tour_id.desc())
+        else:
+            valued = valued.order_by(column.asc().nulls_last(), tour_id)
+        result = await db.execute(valued.limit(count))
+        tours = list(result.scalars().all())
+        if len(tours) == count:
+            return tours
+
+    # Хвост туров без значения, по id в том же направлении
+    tail = query.filter(column.is_(None))
+    if position and position["value"] is None:
+        tail = tail.filter(tour_id < position["id"] if descending else tour_id > position["id"])
+    tail = tail.order_by(tour_id.desc() if descending else tour_id)
+    result = await db.execute(tail.limit(count - len(tours)))
+    return tours + list(result.scalars().all())
+
+@router.get("/", response_model=schemas.TourPage)
+async def get_tours(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    location: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    departure_from: Optional[datetime] = None,
+    departure_to: Optional[datetime] = None,
+    min_duration: Optional[int] = None,
+    max_duration: Optional[int] = None,
+    is_hot: Optional[bool] = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_db)
 ):
-    tours = db.query(models.Tour).offset(skip).limit(limit).all()
-    return [schemas.Tour.from_orm(tour) for tour in tours]
+    if sort not in TOUR_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sort. Allowed: {', '.join(TOUR_SORTS)}"
+        )
+    filters = {
+        "location": location,
+        "min_price": min_price,
+        "max_price": max_price,
+        "departure_from": departure_from,
+        "departure_to": departure_to,
+        "min_duration": min_duration,
+        "max_duration": max_duration,
+        "is_hot": is_hot,
+    }
+    key = tour_list_key("all", sort, cursor or "", limit, *(
+        f"{name}={value}" for name, value in filters.items() if value is not None
+    ))
+    body = await tour_cache.get(key)
+    if body is None:
+        query = select(models.Tour)
+        if location is not None:
+            query = query.filter(models.Tour.location == location)
+        if min_price is not None:
+            query = query.filter(models.Tour.price >= min_price)
+        if max_price is not None:
+            query = query.filter(models.Tour.price <= max_price)
+        if departure_from is not None:
+            query = query.filter(models.Tour.departure_date >= departure_from)
+        if departure_to is not None:
+            query = query.filter(models.Tour.departure_date <= departure_to)
+        if min_duration is not None:
+            query = query.filter(models.Tour.duration >= min_duration)
+        if max_duration is not None:
+            query = query.filter(models.Tour.duration <= max_duration)
+        if is_hot is not None:
+            query = query.filter(models.Tour.is_hot == is_hot)
+        tours = await fetch_sorted_tours(db, query, sort, cursor, limit + 1)
+        next_cursor = None
+        if len(tours) > limit:
+            tours = tours[:limit]
+            next_cursor = encode_tour_cursor(sort, tours[-1])
+        body = render_json(schemas.TourPage(
+            items=[schemas.Tour.from_orm(tour) for tour in tours],
+            next_cursor=next_cursor
+        ))
+        await tour_cache.set(key, body)
+    return json_response(body)
 
 @router.get("/popular", response_model=List[schemas.Tour])
-def get_popular_tours(
+async def get_popular_tours(
     limit: int = 6,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Получаем туры, отсортированные по количеству заявок
-    tours = db.query(models.Tour).order_by(models.Tour.available_spots.desc()).limit(limit).all()
-    return [schemas.Tour.from_orm(tour) for tour in tours]
+    key = tour_list_key("popular", limit)
+    body = await tour_cache.get(key)
+    if body is None:
+        # Получаем туры, отсортированные по взвешенному по давности числу заявок.
+        # Агрегат обновляется вместе с заявками; кэш списка живёт до TTL.
+        # Верхние limit строк берутся из индекса (score DESC, tour_id), туры
+        # подтягиваются к ним по первичному ключу.
+        popularity = models.TourPopularity
+        top = (
+            select(popularity.tour_id, popularity.score)
+            .order_by(popularity.score.desc(), popularity.tour_id)
+            .limit(limit)
+            .subquery()
+        )
+        result = await db.execute(
+            select(models.Tour)
+            .join(top, top.c.tour_id == models.Tour.id)
+            .order_by(top.c.score.desc(), top.c.tour_id)
+        )
+        tours = list(result.scalars().all())
+        if len(tours) < limit:
+            # Заявок мало: добиваем список турами без агрегата по id
+            result = await db.execute(
+                select(models.Tour)
+                .outerjoin(popularity, popularity.tour_id == models.Tour.id)
+                .filter(popularity.tour_id.is_(None))
+                .order_by(models.Tour.id)
+                .limit(limit - len(tours))
+            )
+            tours += result.scalars().all()
+        body = render_tours(tours)
+        await tour_cache.set(key, body)
+    return json_response(body)
 
 @router.get("/hot", response_model=List[schemas.Tour])
-def get_hot_tours(
-    db: Session = Depends(get_db)
+async def get_hot_tours(
+    db: AsyncSession = Depends(get_db)
 ):
-    tours = db.query(models.Tour).filter(models.Tour.is_hot == True).all()
-    return [schemas.Tour.from_orm(tour) for tour in tours]
+    key = tour_list_key("hot")
+    body = await tour_cache.get(key)
+    if body is None:
+        result = await db.execute(select(models.Tour).filter(models.Tour.is_hot == True))
+        body = render_tours(result.scalars().all())
+        await tour_cache.set(key, body)
+    return json_response(body)
 
-@router.get("/{tour_id}", response_model=schemas.Tour)
-def get_tour(
-    tour_id: int,
-    db: Session = Depends(get_db)
+# Колонки выгрузки совпадают с полями импорта, так что файл можно загрузить обратно
+TOUR_EXPORT_FIELDS = ["id", *schemas.TourCreate.__fields__]
+MAX_IMPORT_ERRORS = 100
+
+def parse_tour_row(data) -> dict:
+    """Строка файла импорта -> поля тура; ошибки проверки — ValueError"""
+    if isinstance(data, Exception):
+        raise ValueError(f"Invalid JSON: {data}")
+    if not isinstance(data, dict):
+        raise ValueError("Expected an object")
+    data = dict(data)
+    tour_id = data.pop("id", None)
+    dates = data.get("available_dates")
+    if dates is None:
+        data.pop("available_dates", None)
+    elif isinstance(dates, str):
+        data["available_dates"] = [date for date in dates.split(";") if date]
+    row = schemas.TourCreate(**data).dict()
+    row["id"] = int(tour_id) if tour_id is not None else None
+    return row
+
+@router.get("/export")
+async def export_tours(
+    fmt: str = Query("jsonl", alias="format"),
+    current_user: models.User = Depends(get_current_user)
 ):
-    tour = db.query(models.Tour).filter(models.Tour.id == tour_id).first()
-    if tour is None:
+    """Потоковая выгрузка всех туров в JSONL или CSV"""
+    if not current_user.is_admin:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Tour not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
         )
-    return schemas.Tour.from_orm(tour)
+    fmt = detect_format(fmt)
+
+    async def rows():
+        # Своя сессия: зависимость get_db закрывается до отправки тела ответа
+        async with AsyncSessionLocal() as session:
+            columns = [models.Tour.__table__.c[field] for field in TOUR_EXPORT_FIELDS]
+            result = await session.stream(
+                select(*columns)
+                .order_by(models.Tour.id)
+                .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+            )
+            async for row in result.mappings():
+                yield dict(row)
+
+    return StreamingResponse(
+        stream_rows(rows(), fmt, TOUR_EXPORT_FIELDS),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="tours.{fmt}"'}
+    )
+
+@router.post("/import", response_model=schemas.TourImportResult)
+async def import_tours(
+    file: UploadFile = File(...),
+    fmt: Optional[str] = Query(None, alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Массовый импорт туров из JSONL или CSV.
+
+    Файл читается построчно и пишется пачками по IMPORT_BATCH_SIZE в одной
+    транзакции. Строки с id обновляют существующие туры. Некорректные строки
+    пропускаются и перечисляются в errors.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    fmt = detect_format(fmt, file.filename)
+    lines = codecs.getreader("utf-8-sig")(file.file)
+    records = iter_csv(lines) if fmt == "csv" else iter_jsonl(lines)
+
+    imported = failed = 0
+    errors = []
+    explicit_ids = False
+    while True:
+        # Чтение и разбор файла блокирующие, поэтому выполняются вне цикла событий
+        try:
+            chunk = await run_in_threadpool(list, islice(records, IMPORT_BATCH_SIZE))
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cannot read file: {e}"
+            )
+        if not chunk:
+            break
+        batch = []
+        for line_no, data in chunk:
+            try:
+                batch.append(parse_tour_row(data))
+            except (ValueError, TypeError) as e:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append(schemas.TourImportError(line=line_no, detail=str(e)))
+        if batch:
+            explicit_ids = explicit_ids or any(row["id"] is not None for row in batch)
+            imported += await upsert_tours(db, batch)
+
+    if explicit_ids:
+        await sync_tour_id_sequence(db)
+    await db.commit()
+    await invalidate_all_tours()
+    return schemas.TourImportResult(imported=imported, failed=failed, errors=errors)
+
+@router.get("/{tour_id}", response_model=schemas.Tour)
+async def get_tour(
+    tour_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    key = tour_key(tour_id)
+    body = await tour_cache.get(key)
+    if body is None:
+        tour = await db.get(models.Tour, tour_id)
+        if tour is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tour not found"
+            )
+        body = render_json(schemas.Tour.from_orm(tour))
+        await tour_cache.set(key, body)
+    return json_response(body)
 
 @router.post("/", response_model=schemas.Tour)
-def create_tour(
+async def create_tour(
     tour: schemas.TourCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
@@ -59,15 +377,16 @@ def create_tour(
         )
     db_tour = models.Tour(**tour.dict())
     db.add(db_tour)
-    db.commit()
-    db.refresh(db_tour)
+    await db.commit()
+    await db.refresh(db_tour)
+    await invalidate_tour(db_tour.id)
     return schemas.Tour.from_orm(db_tour)
 
 @router.put("/{tour_id}", response_model=schemas.Tour)
-def update_tour(
+async def update_tour(
     tour_id: int,
     tour: schemas.TourCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
@@ -75,7 +394,7 @@ def update_tour(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    db_tour = db.query(models.Tour).filter(models.Tour.id == tour_id).first()
+    db_tour = await db.get(models.Tour, tour_id)
     if db_tour is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,14 +403,15 @@ def update_tour(
     tour_data = tour.dict()
     for key, value in tour_data.items():
         setattr(db_tour, key, value)
-    db.commit()
-    db.refresh(db_tour)
+    await db.commit()
+    await db.refresh(db_tour)
+    await invalidate_tour(tour_id)
     return schemas.Tour.from_orm(db_tour)
 
 @router.delete("/{tour_id}")
-def delete_tour(
+async def delete_tour(
     tour_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not current_user.is_admin:
@@ -99,12 +419,13 @@ def delete_tour(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    db_tour = db.query(models.Tour).filter(models.Tour.id == tour_id).first()
+    db_tour = await db.get(models.Tour, tour_id)
     if db_tour is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tour not found"
         )
-    db.delete(db_tour)
-    db.commit()
-    return {"message": "Tour deleted successfully"} 
\ No newline at end of file
+    await db.delete(db_tour)
+    await db.commit()
+    await invalidate_tour(tour_id)
+    return {"message": "Tour deleted successfully"}
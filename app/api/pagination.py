@@ -0,0 +1,33 @@
+from fastapi import HTTPException, status
+from datetime import datetime
+from typing import Optional
+import base64
+import json
+
+def encode_cursor(**position) -> str:
+    """Кодирует позицию последней записи страницы в непрозрачный курсор"""
+    data = {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in position.items()
+    }
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str], *fields: str) -> Optional[dict]:
+    """Разбирает курсор; поля created_at возвращаются как datetime"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        position = {field: data[field] for field in fields}
+        if "created_at" in position:
+            position["created_at"] = datetime.fromisoformat(position["created_at"])
+        if "id" in position:
+            position["id"] = int(position["id"])
+        return position
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
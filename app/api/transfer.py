@@ -0,0 +1,80 @@
+from fastapi import HTTPException, status
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+import csv
+import io
+import json
+
+# Форматы массового импорта и выгрузки
+EXPORT_MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Сколько строк отдавать одним куском потока
+EXPORT_CHUNK_ROWS = 500
+
+def detect_format(fmt: Optional[str], filename: Optional[str] = None) -> str:
+    """Формат из параметра или по расширению файла"""
+    if fmt is None and filename:
+        fmt = filename.rsplit(".", 1)[-1].lower()
+        if fmt in ("ndjson", "json"):
+            fmt = "jsonl"
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Allowed: {', '.join(EXPORT_MEDIA_TYPES)}"
+        )
+    return fmt
+
+def iter_jsonl(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """(номер строки, объект) для каждой непустой строки JSONL; при ошибке разбора вместо объекта — ValueError"""
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """(номер записи, словарь) для CSV с заголовком; пустые ячейки — None"""
+    reader = csv.DictReader(lines)
+    for line_no, row in enumerate(reader, start=2):
+        yield line_no, {key: (value if value != "" else None) for key, value in row.items()}
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        # Списки (например, available_dates) пишутся в одну ячейку через «;»
+        return ";".join(str(_csv_value(item)) for item in value)
+    return value
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def stream_rows(rows: AsyncIterator[Dict[str, Any]], fmt: str, fields: List[str]) -> AsyncIterator[bytes]:
+    """Кодирует поток словарей в JSONL или CSV кусками по EXPORT_CHUNK_ROWS строк"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+    count = 0
+    async for row in rows:
+        if writer is not None:
+            writer.writerow({key: _csv_value(row.get(key)) for key in fields})
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False, default=_json_default))
+            buffer.write("\n")
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Optional
+from app.bot.config import settings
+import httpx
+
+class ApiClient:
+    """Клиент API Вкусных Маршрутов с общим пулом соединений на всё время жизни бота"""
+
+    def __init__(
+        self,
+        base_url: str = settings.API_URL,
+        token: str = settings.API_TOKEN,
+        timeout: float = settings.API_TIMEOUT,
+        max_connections: int = settings.API_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.API_MAX_KEEPALIVE_CONNECTIONS,
+        http2: bool = settings.API_HTTP2
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=f"{base_url}/api/v1",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections
+            ),
+            http2=http2
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _get_json(self, url: str, **params) -> Any:
+        response = await self._client.get(url, params={k: v for k, v in params.items() if v is not None})
+        response.raise_for_status()
+        return response.json()
+
+    async def list_tours(self, cursor: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Страница туров: {"items": [...], "next_cursor": ...}"""
+        return await self._get_json("/tours/", cursor=cursor, limit=limit)
+
+    async def create_tour(self, tour_data: Dict[str, Any]) -> httpx.Response:
+        return await self._client.post("/tours/", json=tour_data)
+
+    async def list_requests(self, cursor: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Страница заявок: {"items": [...], "next_cursor": ...}"""
+        return await self._get_json("/requests/", cursor=cursor, limit=limit)
+
+    async def get_request(self, request_id: int) -> Dict[str, Any]:
+        return await self._get_json(f"/requests/{request_id}")
+
+    async def update_request_status(self, request_id: int, status: str) -> Dict[str, Any]:
+        response = await self._client.put(f"/requests/{request_id}/status", params={"status": status})
+        response.raise_for_status()
+        return response.json()
+
+    async def batch_update_status(self, changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Смена статусов пачкой: {"updated": [...], "failed": [{"request_id", "detail"}]}"""
+        response = await self._client.post("/requests/status:batch", json={"items": changes})
+        response.raise_for_status()
+        return response.json()
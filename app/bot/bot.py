@@ -1,19 +1,17 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
-from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
-from app.db import models
+from app.db.database import async_engine
 from app.schemas import schemas
 from datetime import datetime
 from app.bot.config import settings
+from app.bot.api_client import ApiClient
+from app.bot.repository import BotRepository
+from app.bot.processing import AdmissionQueue, ChatOrderedUpdateProcessor
+from app.core.log import setup_logging
 import logging
-import httpx
 
 # Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 def format_datetime(value):
@@ -29,18 +27,43 @@ def format_price(value):
     return f"{value:,.2f} ₽".replace(",", " ")
 
 class Bot:
-    def __init__(self):
-        self.application = Application.builder().token(settings.TELEGRAM_BOT_TOKEN).build()
+    def __init__(self, webhook: bool = False):
+        processor = ChatOrderedUpdateProcessor(
+            workers=settings.BOT_CONCURRENT_UPDATES,
+            max_pending=settings.BOT_MAX_PENDING_UPDATES
+        )
+        builder = (
+            Application.builder()
+            .token(settings.TELEGRAM_BOT_TOKEN)
+            .concurrent_updates(processor)
+            # Обновления выдаются в обработку, только пока есть место (BOT_MAX_PENDING_UPDATES)
+            .update_queue(AdmissionQueue(processor))
+            .post_shutdown(self.post_shutdown)
+        )
+        if webhook:
+            # Обновления приходят через маршрут API, long polling не нужен
+            builder = builder.updater(None)
+        self.application = builder.build()
+        self.webhook = webhook
         self.settings = settings
+        # Один пул соединений к API на всё время работы бота
+        self.api = ApiClient()
+        self.repository = BotRepository()
         self.setup_handlers()
 
+    async def post_shutdown(self, application: Application):
+        """Закрывает соединения с API и базой при остановке бота.
+
+        В режиме webhook движком базы владеет приложение API: пул
+        закрывается при его остановке (app/main.py).
+        """
+        await self.api.close()
+        if not self.webhook:
+            await async_engine.dispose()
+
     def is_admin(self, user_id: int) -> bool:
         """Проверка, является ли пользователь администратором"""
-        logger.info(f"Checking admin rights for user_id: {user_id}")
-        logger.info(f"Admin IDs from settings: {self.settings.ADMIN_IDS}")
-        is_admin = user_id in self.settings.ADMIN_IDS
-        logger.info(f"Is admin: {is_admin}")
-        return is_admin
+        return user_id in self.settings.ADMIN_IDS
 
     def setup_handlers(self):
         """Настраивает обработчики команд"""
@@ -48,6 +71,7 @@ class Bot:
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("help", self.help))
         self.application.add_handler(CommandHandler("admin", self.admin_panel))
+        self.application.add_handler(CommandHandler("stats", self.stats))
 
         # Обработчики callback-запросов
         self.application.add_handler(CallbackQueryHandler(self.handle_callback, pattern="^admin_panel$"))
@@ -58,7 +82,16 @@ class Bot:
         self.application.add_handler(CallbackQueryHandler(self.handle_callback, pattern="^admin_tours$"))
         self.application.add_handler(CallbackQueryHandler(self.handle_callback, pattern="^admin_requests$"))
         self.application.add_handler(CallbackQueryHandler(self.handle_callback, pattern="^main_menu$"))
-        self.application.add_handler(CallbackQueryHandler(self.handle_request_status, pattern="^status_\d+_[a-zA-Z]+$"))
+        self.application.add_handler(CallbackQueryHandler(self.handle_request_status, pattern="^status_\d+_[a-zA-Z]+(_\w+)?$"))
+        self.application.add_handler(CallbackQueryHandler(self.handle_admin_tours, pattern="^tours_(next|prev)_\d+$"))
+        self.application.add_handler(CallbackQueryHandler(
+            self.handle_admin_requests,
+            pattern="^requests_(all|pending|approved|rejected|cancelled)(_(next|prev)_\d+)?$"
+        ))
+        self.application.add_handler(CallbackQueryHandler(self.handle_select_mode, pattern="^select_mode$"))
+        self.application.add_handler(CallbackQueryHandler(self.handle_select_request, pattern="^select_\d+$"))
+        self.application.add_handler(CallbackQueryHandler(self.handle_batch_status, pattern="^batch_(approved|rejected)$"))
+        self.application.add_handler(CallbackQueryHandler(self.handle_noop, pattern="^noop$"))
 
         # Обработчик текстовых сообщений
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
@@ -97,11 +130,33 @@ class Bot:
             "Доступные команды:\n"
             "/start - Начать работу с ботом\n"
             "/help - Показать это сообщение\n"
-            "/admin - Открыть панель администратора\n\n"
+            "/admin - Открыть панель администратора\n"
+            "/stats - Очередь и время обработки обновлений\n\n"
             "Для работы с заявками используйте кнопки в меню."
         )
         await update.message.reply_text(help_text)
 
+    def update_stats(self) -> dict:
+        """Глубина очереди и длительность обработки обновлений"""
+        processor = self.application.update_processor
+        return processor.metrics.snapshot(queue_size=self.application.update_queue.qsize())
+
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /stats"""
+        if not self.is_admin(update.effective_user.id):
+            return
+
+        stats = self.update_stats()
+        latency = stats["handler_latency"]
+        average = latency["total_seconds"] / latency["count"] if latency["count"] else 0.0
+        await update.message.reply_text(
+            "📊 Обработка обновлений\n\n"
+            f"Не начаты: {stats['depth']} (в очереди: {stats['update_queue']}, ждут чат или слот: {stats['waiting']})\n"
+            f"Обрабатываются: {stats['in_progress']}\n"
+            f"Обработано: {stats['processed']} (ошибок: {stats['failed']})\n"
+            f"Среднее время: {average:.3f} с, максимум: {latency['max_seconds']:.3f} с"
+        )
+
     async def admin_panel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает панель администратора"""
         keyboard = [
@@ -146,12 +201,7 @@ class Bot:
     async def list_tours(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показывает список всех туров"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.settings.API_URL}/api/v1/tours/",
-                    headers={"Authorization": f"Bearer {self.settings.API_TOKEN}"}
-                )
-                tours = response.json()
+            tours = (await self.api.list_tours())["items"]
 
             if not tours:
                 text = "📋 Список туров пуст"
@@ -208,13 +258,7 @@ class Bot:
     async def list_requests(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать список заявок"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.settings.API_URL}/api/v1/requests/",
-                    headers={"Authorization": f"Bearer {self.settings.API_TOKEN}"}
-                )
-                response.raise_for_status()
-                requests = response.json()
+            requests = (await self.api.list_requests())["items"]
 
             if not requests:
                 text = "📝 Список заявок пуст"
@@ -291,11 +335,8 @@ class Bot:
         # Проверяем, создается ли тур
         if context.user_data.get('creating_tour'):
             try:
-                logging.info(f"Получены данные для создания тура: {update.message.text}")
-                
                 # Разбиваем текст на строки
                 lines = update.message.text.split('\n')
-                logging.info(f"Разбито на {len(lines)} строк")
                 
                 if len(lines) < 10:
                     raise ValueError(f"Недостаточно данных. Получено {len(lines)} строк, требуется 10")
@@ -312,16 +353,6 @@ class Bot:
                 departure_date = datetime.strptime(lines[8].strip(), "%Y-%m-%d")
                 return_date = datetime.strptime(lines[9].strip(), "%Y-%m-%d")
 
-                logging.info(f"Парсинг данных успешен:")
-                logging.info(f"Название: {title}")
-                logging.info(f"Цена: {price}")
-                logging.info(f"Длительность: {duration}")
-                logging.info(f"Место: {location}")
-                logging.info(f"Макс. участников: {max_participants}")
-                logging.info(f"Свободных мест: {available_spots}")
-                logging.info(f"Дата отправления: {departure_date}")
-                logging.info(f"Дата возвращения: {return_date}")
-
                 # Создаем тур через API
                 tour_data = {
                     "title": title,
@@ -336,19 +367,8 @@ class Bot:
                     "return_date": return_date.isoformat()
                 }
 
-                logging.info(f"Отправка запроса на {self.settings.API_URL}/api/v1/tours/")
-                logging.info(f"Данные тура: {tour_data}")
-                logging.info(f"API Token: {self.settings.API_TOKEN}")
-
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{self.settings.API_URL}/api/v1/tours/",
-                        json=tour_data,
-                        headers={"Authorization": f"Bearer {self.settings.API_TOKEN}"}
-                    )
-
-                logging.info(f"Ответ API: {response.status_code}")
-                logging.info(f"Тело ответа: {response.text}")
+                response = await self.api.create_tour(tour_data)
+                logger.info("Create tour via API: %s", response.status_code)
 
                 if response.status_code == 200:
                     # Если есть предыдущее сообщение о создании тура, обновляем его
@@ -464,12 +484,7 @@ class Bot:
                 "return_date": return_date.isoformat()
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.settings.API_URL}/api/v1/tours/",
-                    json=tour_data,
-                    headers={"Authorization": f"Bearer {self.settings.API_TOKEN}"}
-                )
+            response = await self.api.create_tour(tour_data)
 
             if response.status_code == 200:
                 await update.message.reply_text(
@@ -495,81 +510,6 @@ class Bot:
             # Возвращаемся в админ-панель
             await self.handle_admin_panel(update, context)
 
-    async def notify_admin_about_request(self, request_data: dict):
-        """Отправляет уведомление администратору о новой заявке"""
-        try:
-            status_emoji = {
-                "pending": "⏳",
-                "approved": "✅",
-                "rejected": "❌",
-                "cancelled": "🚫"
-            }.get(request_data.get('status', 'pending'), "❓")
-
-            message = (
-                f"🆕 Новая заявка!\n\n"
-                f"ID: {request_data.get('id')}\n"
-                f"Тур: {request_data.get('tour', {}).get('title', 'Не указан')}\n"
-                f"Статус: {status_emoji} {request_data.get('status', 'pending')}\n"
-                f"Дата создания: {request_data.get('created_at', 'Не указана')}\n\n"
-            )
-
-            if request_data.get('user'):
-                message += f"Пользователь: {request_data['user'].get('username', 'Не указан')}\n"
-            else:
-                message += (
-                    f"Гость:\n"
-                    f"Имя: {request_data.get('guest_name', 'Не указано')}\n"
-                    f"Email: {request_data.get('guest_email', 'Не указано')}\n"
-                    f"Телефон: {request_data.get('guest_phone', 'Не указано')}\n"
-                )
-
-            if request_data.get('comment'):
-                message += f"\nКомментарий: {request_data['comment']}"
-
-            # Добавляем кнопки для быстрого управления статусом
-            keyboard = []
-            for new_status in ["approved", "rejected", "cancelled"]:
-                keyboard.append([
-                    InlineKeyboardButton(
-                        f"Установить статус: {new_status}",
-                        callback_data=f"status_{request_data['id']}_{new_status}"
-                    )
-                ])
-            keyboard.append([InlineKeyboardButton("📝 Все заявки", callback_data="admin_requests")])
-            reply_markup = InlineKeyboardMarkup(keyboard)
-
-            # Отправляем уведомление всем администраторам
-            for admin_id in self.settings.ADMIN_IDS:
-                try:
-                    # Проверяем, существует ли чат
-                    try:
-                        chat = await self.application.bot.get_chat(admin_id)
-                        if chat:
-                            try:
-                                await self.application.bot.send_message(
-                                    chat_id=admin_id,
-                                    text=message,
-                                    reply_markup=reply_markup
-                                )
-                            except Exception as e:
-                                logger.error(f"Error sending message to admin {admin_id}: {e}")
-                                # Пробуем отправить сообщение без кнопок
-                                try:
-                                    await self.application.bot.send_message(
-                                        chat_id=admin_id,
-                                        text=message
-                                    )
-                                except Exception as e2:
-                                    logger.error(f"Error sending plain message to admin {admin_id}: {e2}")
-                    except Exception as e:
-                        logger.error(f"Error checking chat for admin {admin_id}: {e}")
-                        continue
-                except Exception as e:
-                    logger.error(f"Error processing admin {admin_id}: {e}")
-
-        except Exception as e:
-            logger.error(f"Error in notify_admin_about_request: {e}")
-
     async def handle_request_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик изменения статуса заявки"""
         query = update.callback_query
@@ -579,50 +519,34 @@ class Bot:
             await query.message.reply_text("У вас нет прав для изменения статуса заявки.")
             return
 
-        _, request_id, new_status = query.data.split("_")
-        request_id = int(request_id)
-
-        try:
-            async with httpx.AsyncClient() as client:
-                # Получаем текущие данные заявки
-                response = await client.get(
-                    f"{self.settings.API_URL}/api/v1/requests/{request_id}",
-                    headers={"Authorization": f"Bearer {self.settings.API_TOKEN}"}
-                )
-                response.raise_for_status()
-                request_data = response.json()
-
-                # Обновляем статус заявки
-                response = await client.patch(
-                    f"{self.settings.API_URL}/api/v1/requests/{request_id}",
-                    json={"status": new_status},
-                    headers={"Authorization": f"Bearer {self.settings.API_TOKEN}"}
-                )
-                response.raise_for_status()
-
-                # Отправляем уведомление об изменении статуса
-                status_emoji = {
-                    "pending": "⏳",
-                    "approved": "✅",
-                    "rejected": "❌",
-                    "cancelled": "🚫"
-                }.get(new_status, "❓")
-
-                await query.message.reply_text(
-                    f"Статус заявки #{request_id} изменен на {status_emoji} {new_status}"
-                )
-
-                # Показываем обновленный список заявок
-                await self.list_requests(update, context)
+        # status_<id>_<статус>[_<страница заявок>]; без страницы — кнопка из уведомления
+        parts = query.data.split("_", 3)
+        request_id, new_status = int(parts[1]), parts[2]
+        view = parts[3] if len(parts) > 3 else None
 
-                # Отправляем уведомление всем администраторам
-                await self.notify_admin_about_request(request_data)
+        status_emoji = {
+            "pending": "⏳",
+            "approved": "✅",
+            "rejected": "❌",
+            "cancelled": "🚫"
+        }.get(new_status, "❓")
 
+        try:
+            await self.api.update_request_status(request_id, new_status)
         except Exception as e:
             logger.error(f"Error updating request status: {e}")
-            await query.message.reply_text(
-                "❌ Произошла ошибка при обновлении статуса заявки"
-            )
+            notice = "❌ Произошла ошибка при обновлении статуса заявки"
+        else:
+            # Уведомление администраторам API кладёт в outbox вместе со сменой статуса
+            notice = f"Статус заявки #{request_id} изменен на {status_emoji} {new_status}"
+
+        if view is None:
+            await query.message.reply_text(notice)
+            return
+
+        # Перерисовываем ту же страницу списка с обновлённым статусом
+        context.user_data["requests_view"] = view
+        await self.show_requests(query, context, notice)
 
     async def delete_previous_category_messages(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Удаляет предыдущие сообщения категории"""
@@ -637,8 +561,35 @@ class Bot:
                     logger.error(f"Error deleting message {message_id}: {e}")
             context.user_data["last_category_message_ids"] = []
 
+    @staticmethod
+    def parse_page_callback(data: str):
+        """Разбирает <префикс>_next_<id> / <префикс>_prev_<id> в (after, before)"""
+        parts = data.split("_")
+        if len(parts) >= 3 and parts[-2] in ("next", "prev") and parts[-1].isdigit():
+            key = int(parts[-1])
+            return (key, None) if parts[-2] == "next" else (None, key)
+        return None, None
+
+    @staticmethod
+    def pagination_row(prefix: str, page, first_id: int, last_id: int):
+        row = []
+        if page.has_prev:
+            row.append(InlineKeyboardButton("◀️", callback_data=f"{prefix}_prev_{first_id}"))
+        if page.has_next:
+            row.append(InlineKeyboardButton("▶️", callback_data=f"{prefix}_next_{last_id}"))
+        return row
+
+    async def show_page(self, query, text: str, keyboard):
+        """Показывает страницу, редактируя сообщение с кнопкой"""
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        try:
+            await query.message.edit_text(text, reply_markup=reply_markup)
+        except Exception as e:
+            logger.error(f"Error editing page message: {e}")
+            await query.message.reply_text(text, reply_markup=reply_markup)
+
     async def handle_admin_tours(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик просмотра списка туров"""
+        """Обработчик просмотра списка туров (одно сообщение на страницу)"""
         query = update.callback_query
         await query.answer()
 
@@ -646,46 +597,33 @@ class Bot:
             await query.message.reply_text("⛔️ У вас нет прав администратора.")
             return
 
-        # Удаляем предыдущие сообщения категории
-        await self.delete_previous_category_messages(update, context)
+        after, before = self.parse_page_callback(query.data)
+        page = await self.repository.tours_page(self.settings.BOT_PAGE_SIZE, after=after, before=before)
 
-        db = SessionLocal()
-        try:
-            tours = db.query(models.Tour).all()
-            if not tours:
-                await query.message.reply_text("Туры не найдены.")
-                return
-
-            message_ids = []
-            for tour in tours:
-                message = (
-                    f"📋 Тур #{tour.id}\n"
-                    f"Название: {tour.title}\n"
-                    f"Цена: {format_price(tour.price)}\n"
-                    f"Длительность: {tour.duration} дней\n"
-                    f"Место: {tour.location}\n"
-                    f"Свободных мест: {tour.available_spots}/{tour.max_participants}\n"
-                    f"{'🔥 Горящий тур' if tour.is_hot else ''}\n\n"
-                    f"Описание:\n{tour.description}\n"
+        keyboard = []
+        if not page.items:
+            text = "Туры не найдены."
+        else:
+            text = "📋 Туры\n\n"
+            for tour in page.items:
+                text += (
+                    f"#{tour.id} {tour.title}\n"
+                    f"Цена: {format_price(tour.price)} · {tour.duration} дней · {tour.location}\n"
+                    f"Свободных мест: {tour.available_spots}/{tour.max_participants}"
+                    f"{' · 🔥 Горящий тур' if tour.is_hot else ''}\n\n"
                 )
+            row = self.pagination_row("tours", page, page.items[0].id, page.items[-1].id)
+            if row:
+                keyboard.append(row)
 
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Обновить статус", callback_data=f"tour_status_{tour.id}")],
-                    [InlineKeyboardButton("📋 Все туры", callback_data="admin_tours")],
-                    [InlineKeyboardButton("👥 Заявки", callback_data="admin_requests")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                sent_message = await query.message.reply_text(message, reply_markup=reply_markup)
-                message_ids.append(sent_message.message_id)
-
-            # Сохраняем ID сообщений для последующего удаления
-            context.user_data["last_category_message_ids"] = message_ids
-
-        finally:
-            db.close()
+        keyboard.extend([
+            [InlineKeyboardButton("👥 Заявки", callback_data="admin_requests")],
+            [InlineKeyboardButton("🔙 Главное меню", callback_data="main_menu")]
+        ])
+        await self.show_page(query, text, keyboard)
 
     async def handle_admin_requests(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик просмотра списка заявок"""
+        """Обработчик просмотра списка заявок (одно сообщение на страницу)"""
         query = update.callback_query
         await query.answer()
         
@@ -693,70 +631,169 @@ class Bot:
             await query.message.reply_text("⛔️ У вас нет прав администратора.")
             return
 
-        # Удаляем предыдущие сообщения категории
-        await self.delete_previous_category_messages(update, context)
+        # Запоминаем страницу, чтобы выбор заявок перерисовывал именно её
+        context.user_data["requests_view"] = query.data
+        await self.show_requests(query, context)
+
+    async def show_requests(self, query, context: ContextTypes.DEFAULT_TYPE, notice: str = ""):
+        """Рисует сохранённую страницу заявок; в режиме выбора — с отметками и массовыми действиями"""
+        view = context.user_data.get("requests_view", "admin_requests")
+        select_mode = context.user_data.get("select_mode", False)
+        selected = context.user_data.setdefault("selected", set())
+
+        # requests_<фильтр>[_next|_prev_<id>]; admin_requests — все заявки
+        status_filter = "all"
+        if view.startswith("requests_"):
+            status_filter = view.split("_")[1]
+        after, before = self.parse_page_callback(view)
+        page = await self.repository.requests_page(
+            self.settings.BOT_PAGE_SIZE,
+            status=None if status_filter == "all" else status_filter,
+            after=after,
+            before=before
+        )
 
-        db = SessionLocal()
-        try:
-            requests = db.query(models.TravelRequest).all()
-            if not requests:
-                await query.message.reply_text("Заявки не найдены.")
-                return
+        status_emoji = {
+            "pending": "⏳",
+            "approved": "✅",
+            "rejected": "❌",
+            "cancelled": "🚫"
+        }
 
-            message_ids = []
-            for request in requests:
-                status_emoji = {
-                    "pending": "⏳",
-                    "approved": "✅",
-                    "rejected": "❌",
-                    "cancelled": "🚫"
-                }.get(request.status, "❓")
-
-                message = (
-                    f"👥 Заявка #{request.id}\n"
+        keyboard = []
+        if not page.items:
+            text = "Заявки не найдены."
+        else:
+            text = "👥 Заявки\n\n"
+            for request in page.items:
+                text += (
+                    f"#{request.id} {status_emoji.get(request.status, '❓')} {request.status} · "
+                    f"{format_datetime(request.created_at)}\n"
                     f"Тур: {request.tour.title}\n"
-                    f"Статус: {status_emoji} {request.status}\n"
-                    f"Дата: {format_datetime(request.created_at)}\n"
                 )
-
                 if request.user_id:
-                    message += f"Пользователь: {request.user.username}\n"
+                    text += f"Пользователь: {request.user.username}\n"
                 else:
-                    message += (
-                        f"Гость: {request.guest_name}\n"
-                        f"Email: {request.guest_email}\n"
-                        f"Телефон: {request.guest_phone}\n"
-                    )
-
+                    text += f"Гость: {request.guest_name}, {request.guest_email}, {request.guest_phone}\n"
                 if request.comment:
-                    message += f"Комментарий: {request.comment}\n"
-
-                # Добавляем кнопки управления статусом
-                keyboard = []
+                    # Страница должна уложиться в лимит Telegram в 4096 символов
+                    text += f"Комментарий: {request.comment[:200]}\n"
+                text += "\n"
+
+                if select_mode:
+                    # В режиме выбора строка заявки — переключатель отметки
+                    mark = "☑" if request.id in selected else "☐"
+                    keyboard.append([InlineKeyboardButton(
+                        f"{mark} #{request.id} {status_emoji.get(request.status, '❓')}",
+                        callback_data=f"select_{request.id}"
+                    )])
+                    continue
+
+                # Кнопки управления статусом: одна строка на заявку
+                row = [InlineKeyboardButton(f"#{request.id}", callback_data="noop")]
                 for new_status in ["pending", "approved", "rejected", "cancelled"]:
                     if new_status != request.status:
-                        keyboard.append([
-                            InlineKeyboardButton(
-                                f"Установить статус: {new_status}",
-                                callback_data=f"status_{request.id}_{new_status}"
-                            )
-                        ])
-                
-                # Добавляем навигационные кнопки
-                keyboard.extend([
-                    [InlineKeyboardButton("📋 Все туры", callback_data="admin_tours")],
-                    [InlineKeyboardButton("👥 Все заявки", callback_data="admin_requests")]
+                        row.append(InlineKeyboardButton(
+                            status_emoji[new_status],
+                            # Страница в callback: после смены статуса перерисовываем её же
+                            callback_data=f"status_{request.id}_{new_status}_{view}"
+                        ))
+                keyboard.append(row)
+
+            row = self.pagination_row(f"requests_{status_filter}", page, page.items[0].id, page.items[-1].id)
+            if row:
+                keyboard.append(row)
+
+        if select_mode:
+            text = f"Выбрано заявок: {len(selected)}\n\n" + text
+            if selected:
+                keyboard.append([
+                    InlineKeyboardButton(f"✅ Одобрить ({len(selected)})", callback_data="batch_approved"),
+                    InlineKeyboardButton(f"❌ Отклонить ({len(selected)})", callback_data="batch_rejected")
                 ])
-                
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                sent_message = await query.message.reply_text(message, reply_markup=reply_markup)
-                message_ids.append(sent_message.message_id)
-            
-            # Сохраняем ID сообщений для последующего удаления
-            context.user_data["last_category_message_ids"] = message_ids
+            keyboard.append([InlineKeyboardButton("✖️ Отменить выбор", callback_data="select_mode")])
+        elif page.items:
+            keyboard.append([InlineKeyboardButton("☑ Выбрать несколько", callback_data="select_mode")])
+        if notice:
+            text = f"{notice}\n\n{text}"
+
+        # Фильтры по статусу
+        keyboard.append([
+            InlineKeyboardButton(
+                ("• " if status_filter == name else "") + label,
+                callback_data=f"requests_{name}"
+            )
+            for name, label in [("all", "Все"), ("pending", "⏳"), ("approved", "✅"), ("rejected", "❌"), ("cancelled", "🚫")]
+        ])
+        keyboard.extend([
+            [InlineKeyboardButton("📋 Туры", callback_data="admin_tours")],
+            [InlineKeyboardButton("🔙 Главное меню", callback_data="main_menu")]
+        ])
+        await self.show_page(query, text, keyboard)
+
+    async def handle_select_mode(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Включает и выключает режим выбора нескольких заявок"""
+        query = update.callback_query
+        await query.answer()
 
-        finally:
-            db.close()
+        if not self.is_admin(query.from_user.id):
+            await query.message.reply_text("⛔️ У вас нет прав администратора.")
+            return
+
+        context.user_data["select_mode"] = not context.user_data.get("select_mode", False)
+        context.user_data["selected"] = set()
+        await self.show_requests(query, context)
+
+    async def handle_select_request(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Отмечает заявку для массового действия или снимает отметку"""
+        query = update.callback_query
+        await query.answer()
+
+        if not self.is_admin(query.from_user.id):
+            await query.message.reply_text("⛔️ У вас нет прав администратора.")
+            return
+
+        request_id = int(query.data.split("_")[1])
+        selected = context.user_data.setdefault("selected", set())
+        if request_id in selected:
+            selected.discard(request_id)
+        else:
+            selected.add(request_id)
+        await self.show_requests(query, context)
+
+    async def handle_batch_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Одобряет или отклоняет отмеченные заявки одним запросом к API"""
+        query = update.callback_query
+        await query.answer()
+
+        if not self.is_admin(query.from_user.id):
+            await query.message.reply_text("⛔️ У вас нет прав администратора.")
+            return
+
+        new_status = query.data.split("_")[1]
+        selected = sorted(context.user_data.get("selected", set()))
+        if not selected:
+            await self.show_requests(query, context)
+            return
+
+        try:
+            result = await self.api.batch_update_status([
+                {"request_id": request_id, "status": new_status}
+                for request_id in selected
+            ])
+        except Exception as e:
+            logger.error(f"Error updating request statuses: {e}")
+            await self.show_requests(query, context, "❌ Произошла ошибка при обновлении статусов заявок")
+            return
+
+        notice = f"Обновлено заявок: {len(result['updated'])}"
+        if result["failed"]:
+            notice += "\nНе обновлены:\n" + "\n".join(
+                f"#{failure['request_id']}: {failure['detail']}" for failure in result["failed"]
+            )
+        context.user_data["select_mode"] = False
+        context.user_data["selected"] = set()
+        await self.show_requests(query, context, notice)
 
     async def handle_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик возврата в главное меню"""
@@ -767,7 +804,7 @@ class Bot:
             await query.message.reply_text("⛔️ У вас нет прав администратора.")
             return
 
-        # Удаляем предыдущие сообщения категории
+        # Удаляем сообщения, оставшиеся от прежних списков «по сообщению на строку»
         await self.delete_previous_category_messages(update, context)
 
         keyboard = [
@@ -776,12 +813,15 @@ class Bot:
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        sent_message = await query.message.edit_text(
+        await query.message.edit_text(
             "Добро пожаловать в бот администратора Вкусных Маршрутов!\n"
             "Используйте /help для просмотра доступных команд.",
             reply_markup=reply_markup
         )
-        context.user_data["last_category_message_ids"] = [sent_message.message_id]
+
+    async def handle_noop(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Кнопки-подписи без действия"""
+        await update.callback_query.answer()
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик callback-запросов"""
@@ -818,5 +858,8 @@ class Bot:
             await query.message.reply_text("❌ Неизвестная команда")
 
     def run(self):
-        """Запуск бота"""
+        """Запуск бота в режиме long polling"""
+        if self.settings.BOT_MODE == "webhook":
+            logger.info("BOT_MODE=webhook: обновления принимает API (uvicorn app.main:app)")
+            return
         self.application.run_polling() 
\ No newline at end of file
@@ -11,6 +11,24 @@ class Settings(BaseSettings):
     TELEGRAM_BOT_TOKEN: str
     TELEGRAM_GROUP_ID: str
     ADMIN_IDS: str  # Changed to str, will be converted to List[int] in validator
+    # Адрес Bot API (для тестов можно указать локальный фейковый сервер)
+    TELEGRAM_API_URL: str = "https://api.telegram.org/bot"
+    
+    # Очередь уведомлений (outbox)
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_LEASE_SECONDS: int = 60
+    # Сколько хранить отправленные уведомления и как часто их удалять
+    OUTBOX_RETENTION_HOURS: float = 24.0
+    OUTBOX_PRUNE_INTERVAL: float = 300.0
+    # Лимиты Telegram: ~1 сообщение в секунду в чат и ~30 в секунду всего
+    TELEGRAM_PER_CHAT_INTERVAL: float = 1.0
+    TELEGRAM_GLOBAL_RATE: float = 30.0
+    # Общий клиент Bot API
+    TELEGRAM_POOL_SIZE: int = 8
+    TELEGRAM_FANOUT_CONCURRENCY: int = 8
+    TELEGRAM_CHAT_CACHE_TTL: float = 600.0
     
     # Настройки безопасности
     SECRET_KEY: str = "your-secret-key-here"
@@ -20,6 +38,24 @@ class Settings(BaseSettings):
     # Настройки API
     API_URL: str = "http://localhost:8000"
     API_TOKEN: str = "your-api-token-here"
+    API_TIMEOUT: float = 10.0
+    API_MAX_CONNECTIONS: int = 20
+    API_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    API_HTTP2: bool = True
+    
+    # Режим получения обновлений: polling или webhook (маршрут в FastAPI-приложении)
+    BOT_MODE: str = "polling"
+    WEBHOOK_URL: str = ""  # публичный адрес API, например https://example.com
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_SECRET: str = ""  # обязателен при BOT_MODE=webhook
+    # Сколько обновлений обрабатывать одновременно (в одном чате — всегда по очереди)
+    BOT_CONCURRENT_UPDATES: int = 8
+    # Сколько обновлений принимается в обработку одновременно; сверх этого они ждут
+    # в очереди PTB того же размера, а при её заполнении приём обновлений приостанавливается
+    BOT_MAX_PENDING_UPDATES: int = 256
+    
+    # Размер страницы списков туров и заявок в боте
+    BOT_PAGE_SIZE: int = 5
     
     # Настройки приложения
     APP_NAME: str = "Вкусные Маршруты"
@@ -1,156 +1,177 @@
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden
+from telegram.request import HTTPXRequest
 from app.bot.config import settings
+from app.core.cache import TTLCache
 from app.db.models import TravelRequest
-from datetime import datetime, timedelta
+from datetime import timedelta
+from html import escape
+from typing import Awaitable, Callable, Iterable, Optional
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def send_request_notification(bot, request_data: dict, admin_ids: list):
-    """Отправляет уведомление администратору о новой заявке"""
+_bot: Optional[Bot] = None
+# Создаётся в работающем цикле: в Python 3.8 Lock привязан к циклу, активному при создании
+_bot_lock: Optional[asyncio.Lock] = None
+
+# Доступность чатов администраторов: True — сообщение доходило,
+# False — Telegram ответил, что чат недоступен (такие чаты пропускаем до TTL)
+chat_status = TTLCache(maxsize=1024, ttl=settings.TELEGRAM_CHAT_CACHE_TTL)
+
+async def get_bot() -> Bot:
+    """Общий для процесса Bot с пулом keep-alive соединений"""
+    global _bot, _bot_lock
+    if _bot is None:
+        if _bot_lock is None:
+            _bot_lock = asyncio.Lock()
+        async with _bot_lock:
+            if _bot is None:
+                bot = Bot(
+                    token=settings.TELEGRAM_BOT_TOKEN,
+                    base_url=settings.TELEGRAM_API_URL,
+                    request=HTTPXRequest(connection_pool_size=settings.TELEGRAM_POOL_SIZE)
+                )
+                await bot.initialize()
+                _bot = bot
+    return _bot
+
+async def shutdown_bot() -> None:
+    global _bot
+    if _bot is not None:
+        bot, _bot = _bot, None
+        await bot.shutdown()
+
+def _is_chat_not_found(error: BadRequest) -> bool:
+    return "chat not found" in str(error).lower()
+
+class ChatUnreachable(Exception):
+    """Чат уже отмечен недоступным в chat_status"""
+
+async def deliver_message(
+    bot: Bot,
+    chat_id: int,
+    message: str,
+    reply_markup=None,
+    parse_mode=None,
+    before_send: Optional[Callable[[int], Awaitable[None]]] = None
+) -> None:
+    """Отправляет одно сообщение; при ошибке кнопок повторяет без них.
+
+    Ошибки Telegram пробрасываются. Недоступным чат помечается только при
+    Forbidden (бот заблокирован или исключён) и «chat not found»; ошибка в
+    самом сообщении на следующие отправки в этот чат не влияет. before_send
+    вызывается перед каждой попыткой (например, ограничитель частоты).
+    """
+    if chat_status.get(chat_id) is False:
+        raise ChatUnreachable(f"Chat {chat_id} is unreachable")
     try:
-        status_emoji = {
-            "pending": "⏳",
-            "approved": "✅",
-            "rejected": "❌",
-            "cancelled": "🚫"
-        }.get(request_data.get('status', 'pending'), "❓")
-
-        # Преобразуем время создания в UTC+3
-        created_at = datetime.fromisoformat(request_data.get('created_at', '').replace('Z', '+00:00'))
-        created_at = created_at + timedelta(hours=3)
-
-        message = (
-            f"🆕 Новая заявка!\n\n"
-            f"ID: {request_data.get('id')}\n"
-            f"Тур: {request_data.get('tour', {}).get('title', 'Не указан')}\n"
-            f"Статус: {status_emoji} {request_data.get('status', 'pending')}\n"
-            f"Дата создания: {created_at.strftime('%d.%m.%Y %H:%M')} (UTC+3)\n\n"
-        )
+        try:
+            if before_send is not None:
+                await before_send(chat_id)
+            await bot.send_message(
+                chat_id=chat_id,
+                text=message,
+                reply_markup=reply_markup,
+                parse_mode=parse_mode
+            )
+        except BadRequest as e:
+            if reply_markup is None or _is_chat_not_found(e):
+                raise
+            logger.error(f"Error sending message with buttons to chat {chat_id}: {e}")
+            # Пробуем отправить сообщение без кнопок
+            if before_send is not None:
+                await before_send(chat_id)
+            await bot.send_message(chat_id=chat_id, text=message, parse_mode=parse_mode)
+    except Forbidden:
+        chat_status.set(chat_id, False)
+        raise
+    except BadRequest as e:
+        if _is_chat_not_found(e):
+            chat_status.set(chat_id, False)
+        raise
+    chat_status.set(chat_id, True)
 
-        if request_data.get('user'):
-            message += f"Пользователь: {request_data['user'].get('username', 'Не указан')}\n"
+async def send_to_chat(bot: Bot, chat_id: int, message: str, reply_markup=None, parse_mode=None) -> bool:
+    """Отправляет одно сообщение (deliver_message); ошибки логируются, результат — доставлено ли"""
+    try:
+        await deliver_message(bot, chat_id, message, reply_markup, parse_mode)
+    except ChatUnreachable:
+        return False
+    except Forbidden as e:
+        logger.error(f"Chat {chat_id} is unreachable: {e}")
+        return False
+    except BadRequest as e:
+        if _is_chat_not_found(e):
+            logger.error(f"Chat {chat_id} is unreachable: {e}")
         else:
-            message += (
-                f"Гость:\n"
-                f"Имя: {request_data.get('guest_name', 'Не указано')}\n"
-                f"Email: {request_data.get('guest_email', 'Не указано')}\n"
-                f"Телефон: {request_data.get('guest_phone', 'Не указано')}\n"
-            )
+            logger.error(f"Message to chat {chat_id} was rejected: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error sending message to chat {chat_id}: {e}")
+        return False
+    return True
 
-        if request_data.get('comment'):
-            message += f"\nКомментарий: {request_data['comment']}"
+async def send_to_chats(bot: Bot, chat_ids: Iterable[int], message: str, reply_markup=None, parse_mode=None) -> int:
+    """Рассылка с ограничением числа одновременных запросов; возвращает число доставленных"""
+    semaphore = asyncio.Semaphore(settings.TELEGRAM_FANOUT_CONCURRENCY)
 
-        # Добавляем кнопки для быстрого управления статусом
-        keyboard = []
-        for new_status in ["approved", "rejected", "cancelled"]:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"Установить статус: {new_status}",
-                    callback_data=f"status_{request_data['id']}_{new_status}"
-                )
-            ])
-        keyboard.append([InlineKeyboardButton("📝 Все заявки", callback_data="admin_requests")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        # Отправляем уведомление всем администраторам
-        for admin_id in admin_ids:
-            try:
-                # Проверяем, существует ли чат
-                try:
-                    chat = await bot.get_chat(admin_id)
-                    if chat:
-                        try:
-                            await bot.send_message(
-                                chat_id=admin_id,
-                                text=message,
-                                reply_markup=reply_markup
-                            )
-                        except Exception as e:
-                            logger.error(f"Error sending message to admin {admin_id}: {e}")
-                            # Пробуем отправить сообщение без кнопок
-                            try:
-                                await bot.send_message(
-                                    chat_id=admin_id,
-                                    text=message
-                                )
-                            except Exception as e2:
-                                logger.error(f"Error sending plain message to admin {admin_id}: {e2}")
-                except Exception as e:
-                    logger.error(f"Error checking chat for admin {admin_id}: {e}")
-                    continue
-            except Exception as e:
-                logger.error(f"Error processing admin {admin_id}: {e}")
+    async def send(chat_id: int) -> bool:
+        async with semaphore:
+            return await send_to_chat(bot, chat_id, message, reply_markup, parse_mode)
 
-    except Exception as e:
-        logger.error(f"Error in send_request_notification: {e}")
+    results = await asyncio.gather(*(send(chat_id) for chat_id in chat_ids))
+    return sum(results)
 
-async def send_group_notification(request: TravelRequest):
-    """Отправка уведомления о новой заявке администратору"""
-    try:
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-        
-        # Формируем сообщение
+def build_request_notification(request: TravelRequest, event: str = "created"):
+    """Текст и кнопки уведомления о заявке (тур и пользователь должны быть загружены)"""
+    if event == "status_changed":
+        message = f"🔄 Статус заявки изменён: {request.status}\n\n"
+    else:
         message = "🆕 Новая заявка на тур!\n\n"
-        message += f"ID заявки: {request.id}\n"
-        message += f"Тур: {request.tour.title}\n"
-        # Добавляем 3 часа к времени
-        created_at = request.created_at + timedelta(hours=3)
-        message += f"Дата: {created_at.strftime('%d.%m.%Y %H:%M')} (UTC+3)\n\n"
-        
-        if request.user_id:
-            message += f"Пользователь: {request.user.username}\n"
-        else:
-            message += (
-                f"Гость: {request.guest_name}\n"
-                f"Email: {request.guest_email}\n"
-                f"Телефон: {request.guest_phone}\n"
+    message += f"ID заявки: {request.id}\n"
+    message += f"Тур: {escape(request.tour.title)}\n"
+    # Добавляем 3 часа к времени
+    created_at = request.created_at + timedelta(hours=3)
+    message += f"Дата: {created_at.strftime('%d.%m.%Y %H:%M')} (UTC+3)\n\n"
+    
+    if request.user_id:
+        message += f"Пользователь: {escape(request.user.username)}\n"
+    else:
+        message += (
+            f"Гость: {escape(request.guest_name or '')}\n"
+            f"Email: {escape(request.guest_email or '')}\n"
+            f"Телефон: {escape(request.guest_phone or '')}\n"
+        )
+    
+    if request.comment:
+        message += f"\nКомментарий: {escape(request.comment)}"
+    
+    # Добавляем кнопки для быстрого управления статусом
+    keyboard = []
+    for new_status in ["approved", "rejected", "cancelled"]:
+        keyboard.append([
+            InlineKeyboardButton(
+                f"Установить статус: {new_status}",
+                callback_data=f"status_{request.id}_{new_status}"
             )
-        
-        if request.comment:
-            message += f"\nКомментарий: {request.comment}"
-        
-        # Добавляем кнопки для быстрого управления статусом
-        keyboard = []
-        for new_status in ["approved", "rejected", "cancelled"]:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"Установить статус: {new_status}",
-                    callback_data=f"status_{request.id}_{new_status}"
-                )
-            ])
-        keyboard.append([InlineKeyboardButton("📝 Все заявки", callback_data="admin_requests")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Отправляем уведомление администратору
-        admin_id = 1448953141  # Ваш ID
-        try:
-            logger.info(f"Attempting to send message to admin {admin_id}")
-            
-            # Пробуем отправить сообщение с кнопками
-            try:
-                await bot.send_message(
-                    chat_id=admin_id,
-                    text=message,
-                    reply_markup=reply_markup,
-                    parse_mode='HTML'
-                )
-                logger.info(f"Successfully sent message to admin {admin_id}")
-            except Exception as e:
-                logger.error(f"Error sending message with buttons to admin {admin_id}: {e}")
-                # Если не удалось отправить сообщение с кнопками, пробуем без них
-                try:
-                    await bot.send_message(
-                        chat_id=admin_id,
-                        text=message,
-                        parse_mode='HTML'
-                    )
-                    logger.info(f"Successfully sent plain message to admin {admin_id}")
-                except Exception as e2:
-                    logger.error(f"Error sending plain message to admin {admin_id}: {e2}")
-                    
-        except Exception as e:
-            logger.error(f"Error in admin notification: {e}")
-            
-    except Exception as e:
-        logger.error(f"Error in send_group_notification: {e}") 
\ No newline at end of file
+        ])
+    keyboard.append([InlineKeyboardButton("📝 Все заявки", callback_data="admin_requests")])
+    return message, InlineKeyboardMarkup(keyboard)
+
+# Сколько id заявок перечислять в сводном уведомлении для одного статуса
+BATCH_NOTIFICATION_IDS = 50
+
+def build_batch_notification(payload: dict):
+    """Текст и кнопки сводного уведомления о массовой смене статусов"""
+    changes = payload.get("changes", {})
+    total = sum(len(ids) for ids in changes.values())
+    message = f"🔄 Статусы заявок изменены: {total}\n"
+    for status, ids in changes.items():
+        listed = ", ".join(f"#{request_id}" for request_id in ids[:BATCH_NOTIFICATION_IDS])
+        if len(ids) > BATCH_NOTIFICATION_IDS:
+            listed += f" и ещё {len(ids) - BATCH_NOTIFICATION_IDS}"
+        message += f"\n{escape(status)} ({len(ids)}): {listed}\n"
+    keyboard = [[InlineKeyboardButton("📝 Все заявки", callback_data="admin_requests")]]
+    return message, InlineKeyboardMarkup(keyboard)
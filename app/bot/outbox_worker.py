@@ -0,0 +1,216 @@
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from sqlalchemy import delete, select, update
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.bot.config import settings
+from app.bot.notifications import (
+    ChatUnreachable, build_batch_notification, build_request_notification, deliver_message, get_bot, shutdown_bot
+)
+from app.db.database import AsyncSessionLocal
+from app.db.models import NotificationOutbox, TravelRequest
+from app.db.queries import requests_with_tour_and_user
+from app.core.log import setup_logging
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+
+class RateLimiter:
+    """Распределяет отправки с учётом лимитов Telegram на чат и на бота"""
+
+    def __init__(self, per_chat_interval: float, global_rate: float):
+        self.per_chat_interval = per_chat_interval
+        self.global_interval = 1.0 / global_rate
+        self._next_global = 0.0
+        self._next_chat: Dict[int, float] = {}
+        # Создаётся в работающем цикле: в Python 3.8 Lock привязан к циклу, активному при создании
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def wait(self, chat_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = loop.time()
+            at = max(now, self._next_global, self._next_chat.get(chat_id, 0.0))
+            self._next_global = at + self.global_interval
+            self._next_chat[chat_id] = at + self.per_chat_interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+# Итог доставки: (статус, ошибка, задержка до повтора)
+Outcome = Tuple[str, Optional[str], Optional[float]]
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(2 ** attempts, MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+class OutboxWorker:
+    """Отправляет уведомления из notification_outbox пачками с повторами"""
+
+    def __init__(self, bot: Optional[Bot] = None, session_factory=AsyncSessionLocal):
+        self.bot = bot
+        self.session_factory = session_factory
+        self.limiter = RateLimiter(settings.TELEGRAM_PER_CHAT_INTERVAL, settings.TELEGRAM_GLOBAL_RATE)
+        # Создаётся в run(), внутри цикла событий, где воркер работает
+        self._stopping: Optional[asyncio.Event] = None
+
+    async def claim_batch(self) -> List[NotificationOutbox]:
+        """Забирает пачку и откладывает её на время аренды.
+
+        Если воркер упадёт посреди отправки, записи снова станут доступны
+        после OUTBOX_LEASE_SECONDS; SKIP LOCKED позволяет запускать
+        несколько воркеров параллельно.
+        """
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            result = await db.execute(
+                select(NotificationOutbox)
+                .filter(
+                    NotificationOutbox.status == "pending",
+                    NotificationOutbox.next_attempt_at <= now
+                )
+                .order_by(NotificationOutbox.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            items = result.scalars().all()
+            for item in items:
+                item.attempts += 1
+                item.next_attempt_at = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            await db.commit()
+            return items
+
+    async def load_requests(self, request_ids) -> Dict[int, TravelRequest]:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                requests_with_tour_and_user().filter(TravelRequest.id.in_(request_ids))
+            )
+            return {request.id: request for request in result.scalars().all()}
+
+    async def deliver(self, item: NotificationOutbox, request: Optional[TravelRequest]) -> Outcome:
+        if item.event == "status_batch":
+            message, reply_markup = build_batch_notification(item.payload or {})
+        elif request is None:
+            return "dead", "Request not found", None
+        else:
+            message, reply_markup = build_request_notification(request, item.event)
+        try:
+            await deliver_message(
+                self.bot,
+                item.chat_id,
+                message,
+                reply_markup,
+                parse_mode='HTML',
+                before_send=self.limiter.wait
+            )
+        except RetryAfter as e:
+            return "retry", str(e), float(e.retry_after)
+        except (ChatUnreachable, BadRequest, Forbidden) as e:
+            # Повтор не поможет: чат недоступен или сообщение некорректно
+            return "dead", str(e), None
+        except Exception as e:
+            return "retry", str(e), backoff_delay(item.attempts)
+        return "sent", None, None
+
+    async def deliver_chat(self, items, requests) -> List[Tuple[NotificationOutbox, Outcome]]:
+        """Сообщения одного чата уходят по порядку"""
+        return [(item, await self.deliver(item, requests.get(item.request_id))) for item in items]
+
+    async def save_outcomes(self, outcomes: List[Tuple[NotificationOutbox, Outcome]]) -> None:
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for item, (status, error, delay) in outcomes:
+                values = {"last_error": error}
+                if status == "sent":
+                    values.update(status="sent", sent_at=now)
+                elif status == "retry" and item.attempts < settings.OUTBOX_MAX_ATTEMPTS:
+                    values.update(next_attempt_at=now + timedelta(seconds=delay))
+                else:
+                    values.update(status="dead")
+                    logger.error(f"Notification {item.id} to chat {item.chat_id} is dead: {error}")
+                await db.execute(
+                    update(NotificationOutbox)
+                    .where(NotificationOutbox.id == item.id)
+                    .values(**values)
+                )
+            await db.commit()
+
+    async def prune_sent(self) -> int:
+        """Удаляет отправленные уведомления старше OUTBOX_RETENTION_HOURS"""
+        cutoff = datetime.utcnow() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(NotificationOutbox)
+                .where(NotificationOutbox.status == "sent", NotificationOutbox.sent_at < cutoff)
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def run_once(self) -> int:
+        items = await self.claim_batch()
+        if not items:
+            return 0
+        requests = await self.load_requests({item.request_id for item in items if item.request_id is not None})
+
+        by_chat = defaultdict(list)
+        for item in items:
+            by_chat[item.chat_id].append(item)
+        results = await asyncio.gather(
+            *(self.deliver_chat(chat_items, requests) for chat_items in by_chat.values())
+        )
+        await self.save_outcomes([outcome for chat_outcomes in results for outcome in chat_outcomes])
+        return len(items)
+
+    async def run(self) -> None:
+        logger.info("Outbox worker started")
+        self._stopping = asyncio.Event()
+        owns_bot = self.bot is None
+        if owns_bot:
+            self.bot = await get_bot()
+        loop = asyncio.get_running_loop()
+        next_prune = loop.time()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    processed = await self.run_once()
+                except Exception as e:
+                    logger.error(f"Outbox worker iteration failed: {e}", exc_info=True)
+                    processed = 0
+                if loop.time() >= next_prune:
+                    next_prune = loop.time() + settings.OUTBOX_PRUNE_INTERVAL
+                    try:
+                        pruned = await self.prune_sent()
+                        if pruned:
+                            logger.info(f"Pruned {pruned} sent notifications")
+                    except Exception as e:
+                        logger.error(f"Outbox pruning failed: {e}", exc_info=True)
+                if processed < settings.OUTBOX_BATCH_SIZE:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), settings.OUTBOX_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if owns_bot:
+                await shutdown_bot()
+        logger.info("Outbox worker stopped")
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+async def main() -> None:
+    # Воркер создаётся внутри asyncio.run, в том же цикле, где работает
+    await OutboxWorker().run()
+
+if __name__ == "__main__":
+    setup_logging()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,155 @@
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from typing import Any, Awaitable, Dict, Hashable, Optional
+from app.core.config import settings as app_settings
+from app.core.profiling import profile_sql
+from app.core.metrics import Histogram
+import asyncio
+import time
+
+# Границы корзин гистограммы длительности обработчиков, в секундах
+HANDLER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class UpdateMetrics:
+    """Очередь и длительность обработки обновлений бота"""
+
+    def __init__(self):
+        self.waiting = 0
+        self.in_progress = 0
+        self.processed = 0
+        self.failed = 0
+        self.latency = Histogram(HANDLER_BUCKETS)
+
+    def snapshot(self, queue_size: int = 0) -> dict:
+        return {
+            "update_queue": queue_size,
+            # Всё, что ещё не начало обрабатываться: очередь PTB и ожидающие чат или слот
+            "depth": queue_size + self.waiting,
+            "waiting": self.waiting,
+            "in_progress": self.in_progress,
+            "processed": self.processed,
+            "failed": self.failed,
+            "handler_latency": self.latency.snapshot(),
+        }
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Обрабатывает обновления параллельно, но в одном чате — строго по очереди.
+
+    Application PTB создаёт задачу на каждое обновление из очереди, не
+    дожидаясь обработки, поэтому число принятых обновлений ограничивает
+    AdmissionQueue: она выдаёт следующее обновление, только пока принятых
+    меньше max_pending. Рабочие слоты (workers) занимаются уже после
+    блокировки чата, поэтому поток нажатий одного администратора не
+    занимает все слоты и не задерживает остальные чаты.
+    """
+
+    def __init__(self, workers: int, max_pending: int = 256):
+        super().__init__(max_concurrent_updates=max(max_pending, workers))
+        self.workers = workers
+        self.max_pending = max_pending
+        self.metrics = UpdateMetrics()
+        self._admission = asyncio.Semaphore(max_pending)
+        self._slots = asyncio.Semaphore(workers)
+        self._chat_locks: Dict[Hashable, list] = {}
+
+    async def admit(self) -> None:
+        """Ждёт, пока принятых и необработанных обновлений станет меньше max_pending"""
+        await self._admission.acquire()
+
+    def release_admission(self) -> None:
+        self._admission.release()
+
+    @staticmethod
+    def ordering_key(update: object) -> Optional[Hashable]:
+        if isinstance(update, Update):
+            if update.effective_chat is not None:
+                return ("chat", update.effective_chat.id)
+            if update.effective_user is not None:
+                return ("user", update.effective_user.id)
+        return None
+
+    @staticmethod
+    def update_name(update: object) -> str:
+        """Имя обновления для профиля SQL: команда или префикс callback_data"""
+        if isinstance(update, Update):
+            if update.callback_query is not None and update.callback_query.data:
+                return "bot callback " + update.callback_query.data.split("_")[0]
+            if update.message is not None and update.message.text:
+                if update.message.text.startswith("/"):
+                    return "bot command " + update.message.text.split()[0]
+                return "bot message"
+        return "bot update"
+
+    async def run_update(self, update: object, coroutine: "Awaitable[Any]") -> None:
+        if not app_settings.sql_profile:
+            await coroutine
+            return
+        with profile_sql(self.update_name(update)):
+            await coroutine
+
+    async def do_process_update(self, update: object, coroutine: "Awaitable[Any]") -> None:
+        key = self.ordering_key(update)
+        entry = None
+        if key is not None:
+            # [блокировка, число обновлений этого чата в работе или в ожидании]
+            entry = self._chat_locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+
+        self.metrics.waiting += 1
+        started = False
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                async with self._slots:
+                    started = True
+                    self.metrics.waiting -= 1
+                    self.metrics.in_progress += 1
+                    start = time.perf_counter()
+                    try:
+                        await self.run_update(update, coroutine)
+                    except Exception:
+                        self.metrics.failed += 1
+                        raise
+                    finally:
+                        self.metrics.in_progress -= 1
+                        self.metrics.processed += 1
+                        self.metrics.latency.observe(time.perf_counter() - start)
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            self.release_admission()
+            if not started:
+                self.metrics.waiting -= 1
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._chat_locks.pop(key, None)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+class AdmissionQueue(asyncio.Queue):
+    """Очередь обновлений PTB с ограниченным приёмом в обработку.
+
+    get() отдаёт обновление только после ChatOrderedUpdateProcessor.admit(),
+    так что при перегрузке обновления копятся здесь, а не в задачах. Когда
+    очередь заполнена, put() ждёт: polling перестаёт забирать обновления,
+    а webhook отвечает Telegram с задержкой.
+    """
+
+    def __init__(self, processor: ChatOrderedUpdateProcessor, maxsize: Optional[int] = None):
+        super().__init__(processor.max_pending if maxsize is None else maxsize)
+        self.processor = processor
+
+    async def get(self):
+        await self.processor.admit()
+        try:
+            return await super().get()
+        except BaseException:
+            self.processor.release_admission()
+            raise
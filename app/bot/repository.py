@@ -0,0 +1,60 @@
+from sqlalchemy import select
+from typing import List, NamedTuple, Optional
+from app.db.database import AsyncSessionLocal
+from app.db import models
+from app.db.queries import requests_with_tour_and_user
+
+class Page(NamedTuple):
+    items: list
+    has_prev: bool
+    has_next: bool
+
+class BotRepository:
+    """Доступ бота к базе через асинхронные сессии, не блокируя цикл событий"""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def _page(
+        self,
+        query,
+        column,
+        limit: int,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+        descending: bool = False
+    ) -> Page:
+        """Страница по ключу column: after — следующая, before — предыдущая"""
+        backwards = before is not None
+        if backwards:
+            query = query.filter(column > before if descending else column < before)
+        elif after is not None:
+            query = query.filter(column < after if descending else column > after)
+        # Назад идём в обратном порядке и затем разворачиваем страницу
+        query = query.order_by(column.desc() if descending != backwards else column.asc())
+
+        async with self.session_factory() as db:
+            result = await db.execute(query.limit(limit + 1))
+            items = result.scalars().all()
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        if backwards:
+            return Page(list(reversed(items)), has_prev=has_more, has_next=True)
+        return Page(items, has_prev=after is not None, has_next=has_more)
+
+    async def tours_page(self, limit: int, after: Optional[int] = None, before: Optional[int] = None) -> Page:
+        return await self._page(select(models.Tour), models.Tour.id, limit, after, before)
+
+    async def requests_page(
+        self,
+        limit: int,
+        status: Optional[str] = None,
+        after: Optional[int] = None,
+        before: Optional[int] = None
+    ) -> Page:
+        """Заявки от новых к старым, сразу с туром и пользователем"""
+        query = requests_with_tour_and_user()
+        if status:
+            query = query.filter(models.TravelRequest.status == status)
+        return await self._page(query, models.TravelRequest.id, limit, after, before, descending=True)
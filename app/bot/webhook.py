@@ -0,0 +1,68 @@
+from fastapi import APIRouter, FastAPI, HTTPException, Request, status
+from telegram import Update
+from app.bot.config import settings
+import hmac
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+_bot = None
+
+@router.post(settings.WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request):
+    """Принимает обновление от Telegram и ставит его в очередь PTB"""
+    if _bot is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Bot is not running"
+        )
+    # Маршрут открыт в публичном API: без секрета любой мог бы прислать
+    # обновление от имени администратора
+    token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not settings.WEBHOOK_SECRET or not hmac.compare_digest(token, settings.WEBHOOK_SECRET):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid secret token"
+        )
+    application = _bot.application
+    update = Update.de_json(await request.json(), application.bot)
+    await application.update_queue.put(update)
+    return {"ok": True}
+
+async def start_webhook_bot() -> None:
+    global _bot
+    # Импорт здесь: модуль бота тянет обработчики и клиентов, нужных только в этом режиме
+    from app.bot.bot import Bot
+
+    bot = Bot(webhook=True)
+    await bot.application.initialize()
+    await bot.application.start()
+    if settings.WEBHOOK_URL:
+        await bot.application.bot.set_webhook(
+            url=settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH,
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES
+        )
+    else:
+        logger.info("WEBHOOK_URL is not set: accepting locally posted updates only")
+    _bot = bot
+
+async def stop_webhook_bot() -> None:
+    global _bot
+    if _bot is None:
+        return
+    bot, _bot = _bot, None
+    await bot.application.stop()
+    await bot.application.shutdown()
+
+def setup_webhook(app: FastAPI) -> None:
+    """Подключает webhook бота к приложению, если BOT_MODE=webhook"""
+    if settings.BOT_MODE != "webhook":
+        return
+    if not settings.WEBHOOK_SECRET:
+        raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_SECRET")
+    app.include_router(router)
+    app.add_event_handler("startup", start_webhook_bot)
+    app.add_event_handler("shutdown", stop_webhook_bot)
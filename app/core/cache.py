@@ -0,0 +1,312 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from app.core.config import settings
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с ограничением по времени жизни записей"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if isinstance(k, str) and k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+MessageHandler = Callable[[dict], None]
+
+class CacheBackend(ABC):
+    """Хранилище кэша и канал сообщений об инвалидации"""
+
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, message: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def listen(self, handler: MessageHandler) -> None:
+        """Доставляет сообщения других воркеров, пока задачу не отменят"""
+
+    async def close(self) -> None:
+        pass
+
+class MemoryCacheBackend(CacheBackend):
+    """Кэш внутри процесса: подходит для одного воркера и тестов"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._handlers = []
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        self._cache.delete_prefix(prefix)
+
+    async def publish(self, message: dict) -> None:
+        for handler in list(self._handlers):
+            handler(message)
+
+    async def listen(self, handler: MessageHandler) -> None:
+        self._handlers.append(handler)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            self._handlers.remove(handler)
+
+class RedisCacheBackend(CacheBackend):
+    """Общий кэш в Redis (или совместимом сервере) с pub/sub-инвалидацией"""
+
+    shared = True
+
+    def __init__(self, url: str, key_prefix: str, channel: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.key_prefix = key_prefix
+        self.channel = channel
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(self.key_prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._redis.set(self.key_prefix + key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._redis.unlink(self.key_prefix + key)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        keys = [key async for key in self._redis.scan_iter(match=f"{self.key_prefix}{prefix}*", count=500)]
+        if keys:
+            await self._redis.unlink(*keys)
+
+    async def publish(self, message: dict) -> None:
+        await self._redis.publish(self.channel, json.dumps(message))
+
+    async def listen(self, handler: MessageHandler) -> None:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                try:
+                    handler(json.loads(message["data"]))
+                except Exception as e:
+                    logger.error(f"Bad cache invalidation message: {e}")
+        finally:
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.close()
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+def create_cache_backend() -> CacheBackend:
+    if settings.cache_backend == "redis":
+        return RedisCacheBackend(
+            settings.redis_url,
+            key_prefix=settings.cache_key_prefix,
+            channel=settings.cache_invalidation_channel
+        )
+    if settings.cache_backend != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND: {settings.cache_backend}")
+    return MemoryCacheBackend(maxsize=settings.tour_cache_maxsize, ttl=settings.tour_cache_ttl)
+
+TOUR_PREFIX = "tours:"
+TOUR_LIST_PREFIX = "tours:list:"
+
+def tour_key(tour_id: int) -> str:
+    return f"tours:item:{tour_id}"
+
+def tour_list_key(name: str, *params) -> str:
+    return TOUR_LIST_PREFIX + ":".join([name, *map(str, params)])
+
+class TourCatalogCache:
+    """Кэш каталога туров: готовые JSON-байты ответов.
+
+    При общем бэкенде каждый воркер держит короткоживущую локальную копию,
+    которую сбрасывают сообщения об инвалидации из других воркеров.
+    Ошибки бэкенда считаются промахом кэша и не ломают запрос.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, near_ttl: float, maxsize: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.near = TTLCache(maxsize=maxsize, ttl=near_ttl) if backend.shared else None
+        self._listener: Optional[asyncio.Task] = None
+        # Обработчики сообщений других типов (например, сброс кэша авторизации)
+        self._subscribers: Dict[str, MessageHandler] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if self.near is not None:
+            value = self.near.get(key)
+            if value is not None:
+                return value
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Cache get failed for {key}: {e}")
+            return None
+        if value is not None and self.near is not None:
+            self.near.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        if self.near is not None:
+            self.near.set(key, value)
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.error(f"Cache set failed for {key}: {e}")
+
+    def drop_local(self, tour_id: Optional[int] = None, everything: bool = False) -> None:
+        if self.near is None:
+            return
+        if everything:
+            self.near.delete_prefix(TOUR_PREFIX)
+            return
+        if tour_id is not None:
+            self.near.delete(tour_key(tour_id))
+        self.near.delete_prefix(TOUR_LIST_PREFIX)
+
+    def subscribe(self, message_type: str, handler: MessageHandler) -> None:
+        """Вызывает handler на сообщения message_type из канала инвалидации"""
+        self._subscribers[message_type] = handler
+
+    def handle_message(self, message: dict) -> None:
+        if message.get("type") == "tour":
+            self.drop_local(message.get("tour_id"))
+        elif message.get("type") == "tours":
+            self.drop_local(everything=True)
+        elif message.get("type") in self._subscribers:
+            self._subscribers[message["type"]](message)
+
+    async def publish(self, message: dict) -> None:
+        """Рассылает сообщение остальным воркерам; ошибка бэкенда только логируется"""
+        try:
+            await self.backend.publish(message)
+        except Exception as e:
+            logger.error(f"Cache invalidation publish failed for {message.get('type')}: {e}")
+
+    async def invalidate_tour(self, tour_id: Optional[int] = None) -> None:
+        """Сбрасывает карточку тура и все списки, в которые он мог попасть"""
+        self.drop_local(tour_id)
+        try:
+            if tour_id is not None:
+                await self.backend.delete(tour_key(tour_id))
+            await self.backend.delete_prefix(TOUR_LIST_PREFIX)
+            await self.backend.publish({"type": "tour", "tour_id": tour_id})
+        except Exception as e:
+            logger.error(f"Cache invalidation failed for tour {tour_id}: {e}")
+
+    async def invalidate_all(self) -> None:
+        """Сбрасывает весь каталог (после массового импорта)"""
+        self.drop_local(everything=True)
+        try:
+            await self.backend.delete_prefix(TOUR_PREFIX)
+            await self.backend.publish({"type": "tours"})
+        except Exception as e:
+            logger.error(f"Cache invalidation failed for tour catalog: {e}")
+
+    async def start(self) -> None:
+        if self.backend.shared and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                await self.backend.listen(self.handle_message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed: {e}")
+                # Пока подписка не восстановлена, локальная копия может устареть
+                if self.near is not None:
+                    self.near.clear()
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.backend.close()
+
+tour_cache = TourCatalogCache(
+    create_cache_backend(),
+    ttl=settings.tour_cache_ttl,
+    near_ttl=settings.cache_near_ttl,
+    maxsize=settings.tour_cache_maxsize
+)
+
+async def invalidate_tour(tour_id: Optional[int] = None) -> None:
+    await tour_cache.invalidate_tour(tour_id)
+
+async def invalidate_all_tours() -> None:
+    await tour_cache.invalidate_all()
@@ -17,6 +17,33 @@ class Settings(BaseModel):
     def DATABASE_URL(self) -> str:
         return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
+    # Async driver URL for the API (e.g. sqlite+aiosqlite:///./test.db in tests)
+    async_database_url: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        if self.async_database_url:
+            return self.async_database_url
+        return f"postgresql+asyncpg://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+
+    # Connection pool (на один процесс/воркер)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+
+    # Tour catalog cache
+    tour_cache_ttl: float = float(os.getenv("TOUR_CACHE_TTL", "60"))
+    tour_cache_maxsize: int = int(os.getenv("TOUR_CACHE_MAXSIZE", "512"))
+    # memory — кэш в процессе; redis — общий кэш для всех воркеров
+    cache_backend: str = os.getenv("CACHE_BACKEND", "memory")
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    cache_key_prefix: str = os.getenv("CACHE_KEY_PREFIX", "vkusny:")
+    cache_invalidation_channel: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "vkusny:cache-invalidation")
+    # Локальная копия записей общего кэша в каждом воркере
+    cache_near_ttl: float = float(os.getenv("CACHE_NEAR_TTL", "5"))
+
     # Telegram
     telegram_bot_token: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
     telegram_group_id: Optional[str] = os.getenv("TELEGRAM_GROUP_ID")
@@ -25,11 +52,42 @@ class Settings(BaseModel):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "development_secret_key_123")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # kid текущего SECRET_KEY и прежние ключи для ротации: "kid1=secret1,kid2=secret2"
+    jwt_key_id: str = os.getenv("JWT_KEY_ID", "default")
+    jwt_previous_keys: str = os.getenv("JWT_PREVIOUS_KEYS", "")
+    jwt_claims_cache_size: int = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", "10000"))
+    # Хэширование паролей: стоимость bcrypt и пул потоков вне цикла событий
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    # Больше операций в очереди пула — ответ 429
+    password_hash_max_pending: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    # Кэш пользователя по subject токена (в каждом воркере)
+    auth_cache_ttl: float = float(os.getenv("AUTH_CACHE_TTL", "30"))
+    auth_cache_maxsize: int = int(os.getenv("AUTH_CACHE_MAXSIZE", "4096"))
+    # Доверять claims uid/adm в токене без обращения к базе;
+    # права тогда меняются только с выпуском нового токена
+    auth_trust_token_claims: bool = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "False").lower() == "true"
 
     # Admin
     admin_username: str = os.getenv("ADMIN_USERNAME", "admin")
     admin_password: str = os.getenv("ADMIN_PASSWORD", "admin123")
 
+    # Logging
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    # json — одна JSON-строка на запись; text — прежний формат
+    log_format: str = os.getenv("LOG_FORMAT", "text")
+    # Уровни отдельных логгеров: "sqlalchemy.engine=WARNING,httpx=WARNING"
+    log_levels: str = os.getenv("LOG_LEVELS", "httpx=WARNING")
+    # Доля логируемых запросов по префиксу пути: "/api/v1/tours=0.1,/api/v1/health=0"
+    log_sample_rates: str = os.getenv("LOG_SAMPLE_RATES", "")
+
+    # Профилирование SQL по запросам (заголовок X-SQL-Profile, /api/v1/debug/sql-profiles)
+    sql_profile: bool = os.getenv("SQL_PROFILE", "False").lower() == "true"
+    sql_slow_query_ms: float = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))
+    # Столько выполнений одного запроса за запрос считаются N+1
+    sql_repeat_threshold: int = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+    sql_profile_history: int = int(os.getenv("SQL_PROFILE_HISTORY", "100"))
+
     # Application
     app_name: str = os.getenv("APP_NAME", "Vkusny Marshruty")
     debug: bool = os.getenv("DEBUG", "True").lower() == "true"
@@ -0,0 +1,119 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from app.core.config import settings
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import time
+
+# Стандартные атрибуты LogRecord; всё остальное — поля из extra
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+
+def parse_mapping(value: str) -> Dict[str, str]:
+    """Разбирает "key1=value1,key2=value2" в словарь"""
+    result = {}
+    for item in value.split(","):
+        key, sep, item_value = item.strip().partition("=")
+        if sep and key:
+            result[key] = item_value
+    return result
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время, уровень, логгер, сообщение и поля из extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class DeferredQueueHandler(QueueHandler):
+    """Кладёт запись в очередь без форматирования.
+
+    Стандартный QueueHandler.prepare форматирует сообщение в вызывающем
+    потоке и обнуляет args и exc_info, и JsonFormatter не получает
+    исключение. Здесь всё форматирование выполняет поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю INFO/DEBUG-записей с полем route; предупреждения и ошибки проходят всегда.
+
+    Доля задаётся по префиксу пути (самый длинный подходящий префикс),
+    поэтому отброшенные записи даже не форматируются.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, route: str) -> float:
+        for prefix, rate in self.rates:
+            if route.startswith(prefix):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        route = getattr(record, "route", None)
+        if route is None:
+            return True
+        rate = self.rate_for(route)
+        return rate >= 1.0 or random.random() < rate
+
+def setup_logging() -> None:
+    """Логи пишутся через очередь: вызывающий код не ждёт вывода в stdout.
+
+    Уровни, формат (json/text) и доли выборки берутся из Settings.
+    Повторный вызов ничего не делает.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    if settings.log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    handler = DeferredQueueHandler(log_queue)
+    rates = {route: float(rate) for route, rate in parse_mapping(settings.log_sample_rates).items()}
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level.upper())
+    for name, level in parse_mapping(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Дописывает оставшиеся в очереди записи"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
@@ -0,0 +1,196 @@
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import threading
+import time
+
+# Границы корзин гистограммы длительности запросов, в секундах
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Маршрут для запросов, не попавших ни в один эндпоинт (чтобы не плодить метки)
+UNMATCHED_ROUTE = "unmatched"
+
+class Histogram:
+    """Гистограмма длительностей (в секундах) по заданным границам корзин"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.bounds = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            index = len(self.bounds)
+            for i, bound in enumerate(self.bounds):
+                if seconds <= bound:
+                    index = i
+                    break
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound}": n for bound, n in zip(self.bounds, self.counts)}
+            buckets["le_inf"] = self.counts[-1]
+            return {
+                "count": self.count,
+                "total_seconds": round(self.total, 6),
+                "max_seconds": round(self.max, 6),
+                "buckets": buckets,
+            }
+
+class RequestStats:
+    """Запросы к базе, выполненные в рамках одного HTTP-запроса"""
+
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+class Metrics:
+    """Счётчики процесса в памяти; отдаются в формате Prometheus"""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.db_queries: Dict[str, int] = {}
+        self.db_seconds: Dict[str, float] = {}
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def request_started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route, str(status))
+        with self._lock:
+            self.in_flight -= 1
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(REQUEST_BUCKETS)
+            self.db_queries[route] = self.db_queries.get(route, 0) + stats.queries
+            self.db_seconds[route] = self.db_seconds.get(route, 0.0) + stats.query_seconds
+        histogram.observe(seconds)
+
+    def query_finished(self, seconds: float) -> None:
+        """Запрос к базе вне HTTP-запроса (бот, фоновые задачи)"""
+        with self._lock:
+            self.db_queries[""] = self.db_queries.get("", 0) + 1
+            self.db_seconds[""] = self.db_seconds.get("", 0.0) + seconds
+
+    def render(self, gauges: Optional[dict] = None) -> str:
+        """Текст в формате Prometheus; gauges — {имя: (описание, {((метка, значение), ...): число})}"""
+        lines: List[str] = []
+        with self._lock:
+            latency = list(self.latency.items())
+            db_queries = dict(self.db_queries)
+            db_seconds = dict(self.db_seconds)
+            in_flight = self.in_flight
+
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency by route",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in sorted(latency):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            snapshot = histogram.snapshot()
+            count, total = snapshot["count"], snapshot["total_seconds"]
+            cumulative = 0
+            for bound, n in zip(histogram.bounds, snapshot["buckets"].values()):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_requests_in_flight HTTP requests being processed",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+            "# HELP db_queries_total Database queries by HTTP route (empty route: outside requests)",
+            "# TYPE db_queries_total counter",
+        ]
+        for route, n in sorted(db_queries.items()):
+            lines.append(f'db_queries_total{{route="{_escape(route)}"}} {n}')
+        lines += [
+            "# HELP db_query_duration_seconds_total Time spent in database queries by HTTP route",
+            "# TYPE db_query_duration_seconds_total counter",
+        ]
+        for route, seconds in sorted(db_seconds.items()):
+            lines.append(f'db_query_duration_seconds_total{{route="{_escape(route)}"}} {seconds:.6f}')
+
+        for name, (description, values) in (gauges or {}).items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+            for labels, value in values.items():
+                label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics = Metrics()
+
+class MetricsMiddleware:
+    """ASGI-middleware: длительность, статус и число запросов к базе по шаблону маршрута"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.request_started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # FastAPI кладёт найденный маршрут в scope; берём его шаблон, а не путь
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            metrics.request_finished(scope["method"], route, status_code, time.perf_counter() - started, stats)
+            current_request.reset(token)
+
+def instrument_engine(engine: Engine) -> None:
+    """Считает запросы к базе и их время через события движка"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_request.get()
+        if stats is None:
+            metrics.query_finished(seconds)
+        else:
+            stats.queries += 1
+            stats.query_seconds += seconds
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute для упавшего запроса не вызывается
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
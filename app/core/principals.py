@@ -0,0 +1,43 @@
+from typing import Any, Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache, tour_cache
+from app.core.config import settings
+from app.db.models import User
+
+# Поля пользователя, которые нужны для авторизации
+PRINCIPAL_FIELDS = ("id", "email", "username", "is_active", "is_admin", "created_at")
+
+# email -> поля пользователя; другие воркеры сбрасывают его по сообщению
+# из канала инвалидации кэша, TTL страхует на случай потери сообщения
+principal_cache = TTLCache(maxsize=settings.auth_cache_maxsize, ttl=settings.auth_cache_ttl)
+
+# Тип сообщения о сбросе в канале инвалидации (см. app/core/cache.py)
+PRINCIPALS_MESSAGE = "principals"
+
+async def load_principal(db: AsyncSession, email: str) -> Optional[Dict[str, Any]]:
+    """Пользователь по email из кэша, при промахе — из базы"""
+    principal = principal_cache.get(email)
+    if principal is None:
+        result = await db.execute(select(User).filter(User.email == email))
+        user = result.scalars().first()
+        if user is None:
+            return None
+        principal = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        principal_cache.set(email, principal)
+    return principal
+
+def principal_user(principal: Dict[str, Any]) -> User:
+    """Несвязанный с сессией User для зависимостей авторизации"""
+    return User(**principal)
+
+def principal_claims(user: User) -> Dict[str, Any]:
+    """Claims токена: subject и данные для проверки прав без базы"""
+    return {"sub": user.email, "uid": user.id, "adm": bool(user.is_admin)}
+
+async def invalidate_principals() -> None:
+    """Сбрасывает кэш авторизации в этом и во всех остальных воркерах"""
+    principal_cache.clear()
+    await tour_cache.publish({"type": PRINCIPALS_MESSAGE})
+
+tour_cache.subscribe(PRINCIPALS_MESSAGE, lambda message: principal_cache.clear())
@@ -0,0 +1,144 @@
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Заголовок ответа со сводкой профиля (SQL_PROFILE=True)
+PROFILE_HEADER = "X-SQL-Profile"
+
+class SqlProfile:
+    """Запросы к базе одного HTTP-запроса или обработчика бота.
+
+    Тексты запросов параметризованы, поэтому один и тот же текст,
+    выполненный много раз, — признак N+1.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queries = 0
+        self.total_seconds = 0.0
+        # текст запроса -> [число выполнений, суммарное время]
+        self.statements: Dict[str, list] = {}
+        self.slow: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.total_seconds += seconds
+        entry = self.statements.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds * 1000 >= settings.sql_slow_query_ms:
+            self.slow.append((statement, seconds))
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """Запросы, выполненные не меньше SQL_REPEAT_THRESHOLD раз"""
+        return [
+            (statement, count)
+            for statement, (count, _) in self.statements.items()
+            if count >= settings.sql_repeat_threshold
+        ]
+
+    def header(self) -> str:
+        return (
+            f"queries={self.queries}; time_ms={self.total_seconds * 1000:.1f}; "
+            f"repeated={len(self.repeated())}; slow={len(self.slow)}"
+        )
+
+    def summary(self) -> dict:
+        return {
+            "name": self.name,
+            "queries": self.queries,
+            "time_ms": round(self.total_seconds * 1000, 1),
+            "repeated": [
+                {"statement": statement, "count": count}
+                for statement, count in self.repeated()
+            ],
+            "slow": [
+                {"statement": statement, "time_ms": round(seconds * 1000, 1)}
+                for statement, seconds in self.slow
+            ],
+        }
+
+current_profile: ContextVar[Optional[SqlProfile]] = ContextVar("current_profile", default=None)
+
+# Последние профили для GET /api/v1/debug/sql-profiles
+recent_profiles: "deque[dict]" = deque(maxlen=settings.sql_profile_history)
+
+def finish_profile(profile: SqlProfile) -> None:
+    """Сохраняет профиль и предупреждает о N+1 и медленных запросах"""
+    if not profile.queries:
+        return
+    recent_profiles.append(profile.summary())
+    for statement, count in profile.repeated():
+        logger.warning("%s: possible N+1, statement executed %d times: %s", profile.name, count, statement)
+    for statement, seconds in profile.slow:
+        logger.warning("%s: slow query %.1fms: %s", profile.name, seconds * 1000, statement)
+
+@contextmanager
+def profile_sql(name: str) -> Iterator[SqlProfile]:
+    """Профилирует запросы внутри блока; работает в тестах и обработчиках бота.
+
+    with profile_sql("tours") as profile:
+        ...
+    assert profile.queries <= 2
+    """
+    profile = SqlProfile(name)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        finish_profile(profile)
+
+class SqlProfilingMiddleware:
+    """ASGI-middleware: профиль запросов к базе на каждый HTTP-запрос и сводка в заголовке"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_sql(f"{scope['method']} {scope['path']}") as profile:
+
+            async def send_with_profile(message):
+                if message["type"] == "http.response.start":
+                    # Имя по шаблону маршрута, чтобы профили одного эндпоинта сравнивались
+                    route = scope.get("route")
+                    if route is not None:
+                        profile.name = f"{scope['method']} {route.path}"
+                    headers = list(message.get("headers", []))
+                    headers.append((PROFILE_HEADER.lower().encode(), profile.header().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile)
+
+def instrument_profiling(engine: Engine) -> None:
+    """Передаёт текст и время каждого запроса в текущий профиль"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["profile_start"].pop()
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("profile_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
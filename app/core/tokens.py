@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from jose import JWTError, jwk, jwt
+from app.core.cache import TTLCache
+from app.core.config import settings
+import time
+
+def parse_keys(value: str) -> Dict[str, str]:
+    """Разбирает "kid1=secret1,kid2=secret2" в {kid: secret}"""
+    keys = {}
+    for item in value.split(","):
+        kid, sep, secret = item.strip().partition("=")
+        if sep and kid and secret:
+            keys[kid] = secret
+    return keys
+
+class TokenService:
+    """Подпись и проверка JWT с заранее подготовленными ключами.
+
+    Токен подписывается текущим ключом и несёт его kid в заголовке;
+    проверка выбирает ключ по kid, поэтому после смены SECRET_KEY
+    выданные прежним ключом токены действуют до истечения срока.
+    Проверенные claims кэшируются до exp токена.
+    """
+
+    def __init__(self, current_kid: str, keys: Dict[str, str], algorithm: str, cache_size: int):
+        self.current_kid = current_kid
+        self.algorithm = algorithm
+        self.keys = {kid: jwk.construct(secret, algorithm) for kid, secret in keys.items()}
+        self.claims = TTLCache(maxsize=cache_size, ttl=0)
+
+    def encode(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
+        to_encode = data.copy()
+        to_encode["exp"] = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
+        return jwt.encode(
+            to_encode,
+            self.keys[self.current_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.current_kid}
+        )
+
+    def decode(self, token: str) -> Dict[str, Any]:
+        """Claims проверенного токена; ошибка подписи или срока — JWTError"""
+        claims = self.claims.get(token)
+        if claims is not None:
+            return dict(claims)
+        # Токены, выданные до появления kid, подписаны текущим ключом
+        kid = jwt.get_unverified_header(token).get("kid", self.current_kid)
+        key = self.keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown key id: {kid}")
+        claims = jwt.decode(token, key, algorithms=[self.algorithm])
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            ttl = exp - time.time()
+            if ttl > 0:
+                self.claims.set(token, claims, ttl=ttl)
+        return dict(claims)
+
+token_service = TokenService(
+    current_kid=settings.jwt_key_id,
+    keys={**parse_keys(settings.jwt_previous_keys), settings.jwt_key_id: settings.SECRET_KEY},
+    algorithm=settings.ALGORITHM,
+    cache_size=settings.jwt_claims_cache_size
+)
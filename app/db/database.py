@@ -1,7 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.profiling import instrument_profiling
+from app.db.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,13 +13,58 @@ logger = logging.getLogger(__name__)
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 logger.info(f"Connecting to database: {SQLALCHEMY_DATABASE_URL}")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def pool_options(url: str, poolclass) -> dict:
+    """Параметры пула из настроек; sqlite использует свой пул по умолчанию"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+# Синхронный движок: sqladmin, бот, alembic и seed
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    **pool_options(SQLALCHEMY_DATABASE_URL, TimedQueuePool)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок для эндпоинтов API
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    **pool_options(settings.ASYNC_DATABASE_URL, TimedAsyncAdaptedQueuePool)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Число и время запросов к базе для /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if settings.sql_profile:
+    instrument_profiling(engine)
+    instrument_profiling(async_engine.sync_engine)
+
 Base = declarative_base()
 
 # Dependency
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Database session error: {str(e)}")
+            await db.rollback()
+            raise
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
@@ -23,4 +72,4 @@ def get_db():
         logger.error(f"Database session error: {str(e)}")
         raise
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
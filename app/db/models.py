@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, ARRAY
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Index, Integer, JSON, String, Float, DateTime, Text, ARRAY
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
@@ -37,6 +37,17 @@ class Tour(Base):
     
     requests = relationship("TravelRequest", back_populates="tour")
 
+    __table_args__ = (
+        # Фильтры и сортировки каталога (GET /tours/)
+        Index("ix_tours_location_price_id", "location", "price", "id"),
+        Index("ix_tours_price_id", "price", "id"),
+        Index("ix_tours_departure_date_id", "departure_date", "id"),
+        Index("ix_tours_duration_id", "duration", "id"),
+        Index("ix_tours_is_hot_departure_date", "is_hot", "departure_date"),
+        Index("ix_tours_price_desc_id", price.desc().nulls_last(), id.desc()),
+        Index("ix_tours_rating_desc_id", rating.desc().nulls_last(), id.desc()),
+    )
+
 class TravelRequest(Base):
     __tablename__ = "travel_requests"
 
@@ -54,4 +65,52 @@ class TravelRequest(Base):
     comment = Column(Text, nullable=True)
     
     user = relationship("User", back_populates="requests")
-    tour = relationship("Tour", back_populates="requests") 
\ No newline at end of file
+    tour = relationship("Tour", back_populates="requests")
+
+    __table_args__ = (
+        # Ключи для постраничной выдачи заявок
+        Index("ix_travel_requests_created_at_id", "created_at", "id"),
+        Index("ix_travel_requests_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+class TourPopularity(Base):
+    """Агрегат популярности тура, обновляется вместе с заявками"""
+    __tablename__ = "tour_popularity"
+
+    tour_id = Column(Integer, ForeignKey("tours.id", ondelete="CASCADE"), primary_key=True)
+    requests_count = Column(Integer, default=0, nullable=False)
+    pending_count = Column(Integer, default=0, nullable=False)
+    approved_count = Column(Integer, default=0, nullable=False)
+    rejected_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    # Сумма весов заявок, растущих со временем (см. app/db/popularity.py)
+    score = Column(Float, default=0.0, nullable=False)
+    last_request_at = Column(DateTime, nullable=True)
+
+    tour = relationship("Tour")
+
+    __table_args__ = (
+        Index("ix_tour_popularity_score_tour_id", score.desc(), tour_id),
+    )
+
+class NotificationOutbox(Base):
+    """Уведомление в Telegram, записанное в одной транзакции с заявкой"""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(BigInteger, nullable=False)
+    # Пусто у сводных уведомлений (status_batch): их заявки перечислены в payload
+    request_id = Column(Integer, ForeignKey("travel_requests.id", ondelete="CASCADE"), nullable=True)
+    event = Column(String, nullable=False)  # created, status_changed, status_batch
+    payload = Column(JSON, nullable=True)
+    status = Column(String, default="pending", nullable=False)  # pending, sent, dead
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_notification_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
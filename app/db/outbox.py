@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Dict, Iterable, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import NotificationOutbox
+
+async def enqueue_request_notification(
+    db: AsyncSession,
+    request_id: int,
+    event: str,
+    chat_ids: Iterable[int]
+) -> None:
+    """Кладёт уведомление в outbox; фиксируется тем же commit, что и заявка"""
+    now = datetime.utcnow()
+    db.add_all([
+        NotificationOutbox(
+            chat_id=chat_id,
+            request_id=request_id,
+            event=event,
+            status="pending",
+            attempts=0,
+            next_attempt_at=now
+        )
+        for chat_id in chat_ids
+    ])
+
+async def enqueue_batch_notification(
+    db: AsyncSession,
+    changes: Dict[str, List[int]],
+    chat_ids: Iterable[int]
+) -> None:
+    """Одно сводное уведомление о массовой смене статусов: {статус: [id заявок]}"""
+    now = datetime.utcnow()
+    db.add_all([
+        NotificationOutbox(
+            chat_id=chat_id,
+            request_id=None,
+            event="status_batch",
+            payload={"changes": changes},
+            status="pending",
+            attempts=0,
+            next_attempt_at=now
+        )
+        for chat_id in chat_ids
+    ])
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import TourPopularity
+
+# Вес заявки удваивается каждые POPULARITY_HALF_LIFE_DAYS дней от эпохи.
+# Сравнение сумм таких весов равносильно сравнению сумм, затухающих к
+# текущему моменту, поэтому агрегат не нужно пересчитывать со временем.
+POPULARITY_EPOCH = datetime(2025, 1, 1)
+POPULARITY_HALF_LIFE_DAYS = 14
+
+STATUS_COLUMNS = {
+    "pending": "pending_count",
+    "approved": "approved_count",
+    "rejected": "rejected_count",
+    "cancelled": "cancelled_count",
+}
+
+def recency_weight(moment: datetime) -> float:
+    age = (moment - POPULARITY_EPOCH).total_seconds()
+    return 2.0 ** (age / (POPULARITY_HALF_LIFE_DAYS * 86400))
+
+def _insert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(TourPopularity)
+
+async def _apply(
+    db: AsyncSession,
+    tour_id: int,
+    counts: Dict[str, int],
+    score: float = 0.0,
+    last_request_at: Optional[datetime] = None
+) -> None:
+    """Одно INSERT ... ON CONFLICT DO UPDATE в текущей транзакции"""
+    columns = TourPopularity.__table__.c
+    values = {column: max(delta, 0) for column, delta in counts.items()}
+    updates = {column: columns[column] + delta for column, delta in counts.items()}
+    if score:
+        values["score"] = score
+        updates["score"] = columns.score + score
+    if last_request_at is not None:
+        values["last_request_at"] = last_request_at
+        updates["last_request_at"] = last_request_at
+
+    stmt = _insert(db).values(tour_id=tour_id, **values)
+    stmt = stmt.on_conflict_do_update(index_elements=["tour_id"], set_=updates)
+    await db.execute(stmt)
+
+async def record_request_created(db: AsyncSession, tour_id: int, status: str = "pending") -> None:
+    now = datetime.utcnow()
+    await _apply(
+        db,
+        tour_id,
+        {"requests_count": 1, STATUS_COLUMNS[status]: 1},
+        score=recency_weight(now),
+        last_request_at=now
+    )
+
+async def record_status_change(db: AsyncSession, tour_id: int, old_status: str, new_status: str) -> None:
+    if old_status == new_status:
+        return
+    counts = {}
+    if old_status in STATUS_COLUMNS:
+        counts[STATUS_COLUMNS[old_status]] = -1
+    if new_status in STATUS_COLUMNS:
+        counts[STATUS_COLUMNS[new_status]] = 1
+    if counts:
+        await _apply(db, tour_id, counts)
+
+async def record_status_changes(db: AsyncSession, transitions) -> None:
+    """Как record_status_change, но одним запросом на тур для набора (tour_id, old, new)"""
+    per_tour: Dict[int, Dict[str, int]] = {}
+    for tour_id, old_status, new_status in transitions:
+        if old_status == new_status:
+            continue
+        counts = per_tour.setdefault(tour_id, {})
+        if old_status in STATUS_COLUMNS:
+            column = STATUS_COLUMNS[old_status]
+            counts[column] = counts.get(column, 0) - 1
+        if new_status in STATUS_COLUMNS:
+            column = STATUS_COLUMNS[new_status]
+            counts[column] = counts.get(column, 0) + 1
+    for tour_id, counts in per_tour.items():
+        counts = {column: delta for column, delta in counts.items() if delta}
+        if counts:
+            await _apply(db, tour_id, counts)
@@ -0,0 +1,17 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app.db.models import TravelRequest
+
+def requests_with_tour_and_user():
+    """SELECT заявок сразу с туром и пользователем (один запрос с JOIN)"""
+    return select(TravelRequest).options(
+        joinedload(TravelRequest.tour),
+        joinedload(TravelRequest.user)
+    )
+
+def request_with_tour_and_user(request_id: int):
+    return (
+        requests_with_tour_and_user()
+        .filter(TravelRequest.id == request_id)
+        .execution_options(populate_existing=True)
+    )
@@ -0,0 +1,94 @@
+from sqlalchemy import Integer, column, func, or_, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Set
+from app.db.models import Tour
+
+# Место за заявкой держится, только пока она одобрена
+SEAT_HOLDING_STATUSES = {"approved"}
+
+async def reserve_seat(db: AsyncSession, tour_id: int) -> bool:
+    """Атомарно занимает место: UPDATE ... WHERE available_spots > 0 RETURNING.
+
+    Проверка и уменьшение выполняются одной командой под блокировкой строки,
+    поэтому параллельные одобрения не могут продать больше мест, чем есть.
+    """
+    result = await db.execute(
+        update(Tour)
+        .where(Tour.id == tour_id, Tour.available_spots > 0)
+        .values(available_spots=Tour.available_spots - 1)
+        .returning(Tour.available_spots)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none() is not None
+
+async def release_seat(db: AsyncSession, tour_id: int) -> None:
+    """Возвращает место, не превышая max_participants"""
+    await db.execute(
+        update(Tour)
+        .where(
+            Tour.id == tour_id,
+            or_(Tour.max_participants.is_(None), Tour.available_spots < Tour.max_participants)
+        )
+        .values(available_spots=Tour.available_spots + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def apply_status_transition(db: AsyncSession, tour_id: int, old_status: str, new_status: str) -> bool:
+    """Учитывает места при смене статуса; False — свободных мест нет"""
+    held = old_status in SEAT_HOLDING_STATUSES
+    holds = new_status in SEAT_HOLDING_STATUSES
+    if holds and not held:
+        return await reserve_seat(db, tour_id)
+    if held and not holds:
+        await release_seat(db, tour_id)
+    return True
+
+def seat_deltas(transitions) -> Dict[int, int]:
+    """Изменение свободных мест по турам для набора (tour_id, old, new)"""
+    deltas: Dict[int, int] = {}
+    for tour_id, old_status, new_status in transitions:
+        held = old_status in SEAT_HOLDING_STATUSES
+        holds = new_status in SEAT_HOLDING_STATUSES
+        if held != holds:
+            deltas[tour_id] = deltas.get(tour_id, 0) + (-1 if holds else 1)
+    return {tour_id: delta for tour_id, delta in deltas.items() if delta}
+
+async def apply_seat_deltas(db: AsyncSession, deltas: Dict[int, int]) -> Set[int]:
+    """Одним UPDATE ... FROM (VALUES ...) меняет места сразу по всем турам.
+
+    Тур обновляется, только если мест хватает на весь его прирост заявок;
+    возвращённые места не превышают max_participants. Возвращает id
+    обновлённых туров.
+
+    Строки туров сначала блокируются в порядке id: порядок обхода в самом
+    UPDATE ... FROM зависит от плана, и встречные пачки могли бы
+    заблокировать друг друга.
+    """
+    if not deltas:
+        return set()
+    tour_ids = sorted(deltas)
+    await db.execute(
+        select(Tour.id)
+        .where(Tour.id.in_(tour_ids))
+        .order_by(Tour.id)
+        .with_for_update()
+    )
+    changes = values(
+        column("tour_id", Integer),
+        column("delta", Integer),
+        name="seat_deltas"
+    ).data([(tour_id, deltas[tour_id]) for tour_id in tour_ids])
+    new_spots = Tour.available_spots + changes.c.delta
+    result = await db.execute(
+        update(Tour)
+        .where(Tour.id == changes.c.tour_id, new_spots >= 0)
+        .values(available_spots=func.least(new_spots, func.coalesce(Tour.max_participants, new_spots)))
+        .returning(Tour.id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars().all())
+
+async def available_spots(db: AsyncSession, tour_ids) -> Dict[int, int]:
+    """Свободные места туров по id"""
+    result = await db.execute(select(Tour.id, Tour.available_spots).where(Tour.id.in_(list(tour_ids))))
+    return {tour_id: spots or 0 for tour_id, spots in result.all()}
@@ -0,0 +1,53 @@
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List
+from app.db.models import Tour
+
+# Размер пачки для INSERT ... ON CONFLICT при импорте
+IMPORT_BATCH_SIZE = 1000
+
+def _upsert(db: AsyncSession):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Tour)
+
+async def upsert_tours(db: AsyncSession, rows: List[Dict[str, Any]]) -> int:
+    """Записывает пачку туров в текущей транзакции.
+
+    Строки с id обновляют существующий тур (INSERT ... ON CONFLICT (id)
+    DO UPDATE), строки без id вставляются одним executemany. Все строки
+    должны иметь одинаковый набор полей. Возвращает число записанных туров:
+    повторы одного id считаются один раз.
+    """
+    # Повтор id в одной пачке ON CONFLICT не допускает: побеждает последняя строка
+    with_id = list({row["id"]: row for row in rows if row.get("id") is not None}.values())
+    without_id = [row for row in rows if row.get("id") is None]
+    if with_id:
+        statement = _upsert(db).values(with_id)
+        fields = [key for key in with_id[0] if key != "id"]
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[Tour.id],
+            set_={field: statement.excluded[field] for field in fields}
+        ))
+    if without_id:
+        await db.execute(insert(Tour), [
+            {key: value for key, value in row.items() if key != "id"}
+            for row in without_id
+        ])
+    return len(with_id) + len(without_id)
+
+async def sync_tour_id_sequence(db: AsyncSession) -> None:
+    """Сдвигает последовательность id после вставки туров с явными id.
+
+    В SQLite следующий id и так берётся после наибольшего.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    max_id = (await db.execute(select(func.max(Tour.id)))).scalar()
+    if max_id is not None:
+        await db.execute(
+            text("SELECT setval(pg_get_serial_sequence('tours', 'id'), :max_id)"),
+            {"max_id": max_id}
+        )
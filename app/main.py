@@ -4,10 +4,17 @@ from starlette.middleware.sessions import SessionMiddleware
 from app.core.config import settings
 from app.api import api_router
 from app.admin import setup_admin
+from app.core.cache import tour_cache
+from app.db.database import async_engine, engine
+from app.bot.webhook import setup_webhook
+from app.core.log import setup_logging
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import SqlProfilingMiddleware
 import logging
+import time
 
 # Настройка логирования
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -33,6 +40,13 @@ app.add_middleware(
     max_age=3600  # 1 hour
 )
 
+# Длительность запросов и число запросов к базе по маршрутам (/api/v1/metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Профиль запросов к базе на каждый запрос (SQL_PROFILE=True)
+if settings.sql_profile:
+    app.add_middleware(SqlProfilingMiddleware)
+
 # Подключаем маршруты API
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -40,14 +54,42 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 app.state.secret_key = settings.SECRET_KEY
 setup_admin(app)
 
+# Webhook Telegram-бота (BOT_MODE=webhook)
+setup_webhook(app)
+
 # Логирование запросов (должно быть последним)
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    logger.info(f"Incoming request: {request.method} {request.url}")
+    started = time.perf_counter()
     response = await call_next(request)
-    logger.info(f"Response status: {response.status_code}")
+    duration_ms = (time.perf_counter() - started) * 1000
+    # Одна запись на запрос; route используется для выборки (LOG_SAMPLE_RATES)
+    path = request.url.path
+    logger.info(
+        "%s %s %s %.1fms", request.method, path, response.status_code, duration_ms,
+        extra={
+            "route": path,
+            "method": request.method,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 1),
+        }
+    )
     return response
 
+@app.on_event("startup")
+async def start_cache():
+    await tour_cache.start()
+
+@app.on_event("shutdown")
+async def close_cache():
+    await tour_cache.close()
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    # Пулы закрываются после остановки бота (BOT_MODE=webhook), который ими пользуется
+    await async_engine.dispose()
+    engine.dispose()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Vkusny Marshruty API"} 
\ No newline at end of file
@@ -21,12 +21,12 @@ class User(UserBase):
 
 class TourBase(BaseModel):
     title: str
-    description: str
+    description: Optional[str] = None
     price: float
     duration: int
     image_url: str
     location: str
-    rating: float = 0.0
+    rating: Optional[float] = 0.0
     max_participants: int
     available_spots: int
     is_hot: bool = False
@@ -44,6 +44,19 @@ class Tour(TourBase):
     id: int
     created_at: datetime
 
+class TourPage(BaseModel):
+    items: List[Tour]
+    next_cursor: Optional[str] = None
+
+class TourImportError(BaseModel):
+    line: int
+    detail: str
+
+class TourImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TourImportError]
+
 class TravelRequestBase(BaseModel):
     tour_id: int
 
@@ -85,6 +98,54 @@ class TravelRequest(TravelRequestBase):
     class Config:
         from_attributes = True
 
+class TourSummary(BaseModel):
+    id: int
+    title: str
+
+    class Config:
+        from_attributes = True
+
+class UserSummary(BaseModel):
+    id: int
+    username: str
+    email: EmailStr
+
+    class Config:
+        from_attributes = True
+
+class TravelRequestDetail(TravelRequest):
+    tour: Optional[TourSummary] = None
+    user: Optional[UserSummary] = None
+
+class TravelRequestPage(BaseModel):
+    items: List[TravelRequestDetail]
+    next_cursor: Optional[str] = None
+
+class RequestStatusChange(BaseModel):
+    request_id: int
+    status: str
+
+class RequestStatusBatch(BaseModel):
+    items: List[RequestStatusChange]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"request_id": 1, "status": "approved"},
+                    {"request_id": 2, "status": "rejected"}
+                ]
+            }
+        }
+
+class RequestStatusFailure(BaseModel):
+    request_id: int
+    detail: str
+
+class RequestStatusBatchResult(BaseModel):
+    updated: List[TravelRequest]
+    failed: List[RequestStatusFailure]
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,87 @@
+"""Нагрузка на проверку паролей при входе.
+
+Запускает REQUESTS проверок пароля (как в POST /auth/login) по CONCURRENCY
+одновременно и печатает пропускную способность, задержки (p50/p95/p99),
+число ответов 429 и наибольшую задержку цикла событий. Параметры bcrypt
+и пула берутся из окружения, как в приложении:
+
+    BCRYPT_ROUNDS=12 PASSWORD_HASH_WORKERS=4 PASSWORD_HASH_MAX_PENDING=32 \\
+        python -m benchmarks.login_benchmark --requests 200 --concurrency 64
+"""
+from fastapi import HTTPException
+from app.core import security
+from app.core.config import settings
+import argparse
+import asyncio
+import statistics
+import time
+
+PASSWORD = "benchmark password"
+
+def percentile(ordered, fraction: float) -> float:
+    """Значение перцентиля по отсортированному списку (ближайший ранг)"""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Наибольшее опоздание пробуждения цикла событий, в секундах"""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - started - interval)
+    return worst
+
+async def run(requests: int, concurrency: int) -> None:
+    hashed = security.get_password_hash(PASSWORD)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async def attempt():
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                verified, _ = await security.check_password(PASSWORD, hashed)
+                assert verified
+            except HTTPException as e:
+                if e.status_code != 429:
+                    raise
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(attempt() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await lag
+
+    print(
+        f"bcrypt rounds={settings.bcrypt_rounds} workers={settings.password_hash_workers} "
+        f"max pending={settings.password_hash_max_pending}"
+    )
+    print(f"requests={requests} concurrency={concurrency} elapsed={elapsed:.2f}s")
+    print(f"verified={len(latencies)} ({len(latencies) / elapsed:.1f}/s) rejected with 429={rejected}")
+    if latencies:
+        latencies.sort()
+        p95 = percentile(latencies, 0.95)
+        p99 = percentile(latencies, 0.99)
+        print(
+            f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p95={p95 * 1000:.1f}ms p99={p99 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms"
+        )
+    print(f"max event loop lag={worst_lag * 1000:.1f}ms")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Скорость проверки JWT с кэшем claims и без него.
+
+Выпускает TOKENS разных токенов и проверяет каждый ROUNDS раз: первый
+проход — полная проверка подписи, следующие — попадания в кэш claims.
+Для сравнения те же токены проверяются напрямую через jose.jwt.decode.
+
+    python -m benchmarks.token_benchmark --tokens 1000 --rounds 10
+"""
+from datetime import timedelta
+from jose import jwt
+from app.core.tokens import TokenService
+import argparse
+import time
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:,.0f}/s ({seconds / count * 1e6:.1f}us each)"
+
+def run(tokens: int, rounds: int) -> None:
+    secret = "benchmark-secret"
+    service = TokenService(current_kid="bench", keys={"bench": secret}, algorithm="HS256", cache_size=tokens)
+
+    started = time.perf_counter()
+    issued = [
+        service.encode({"sub": f"user{n}@example.com", "uid": n, "adm": False}, timedelta(minutes=30))
+        for n in range(tokens)
+    ]
+    print(f"encode: {rate(tokens, time.perf_counter() - started)}")
+
+    started = time.perf_counter()
+    for token in issued:
+        jwt.decode(token, secret, algorithms=["HS256"])
+    print(f"jose.jwt.decode: {rate(tokens, time.perf_counter() - started)}")
+
+    started = time.perf_counter()
+    for token in issued:
+        service.decode(token)
+    print(f"decode, cold cache: {rate(tokens, time.perf_counter() - started)}")
+
+    if rounds > 1:
+        started = time.perf_counter()
+        for _ in range(rounds - 1):
+            for token in issued:
+                service.decode(token)
+        print(f"decode, cached: {rate(tokens * (rounds - 1), time.perf_counter() - started)}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    run(args.tokens, args.rounds)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Пул хэширования паролей и пересчёт устаревших хэшей при входе"""
+import asyncio
+import threading
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from passlib.hash import bcrypt
+from app.api.endpoints import auth
+from app.core import security
+from app.core.config import settings
+from app.db import models
+from app.db.database import get_db
+
+PASSWORD = "correct horse"
+
+class FakeResult:
+    def __init__(self, user):
+        self.user = user
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.user
+
+class FakeSession:
+    """Сессия, которая на любой запрос возвращает одного пользователя"""
+
+    def __init__(self, user):
+        self.user = user
+        self.commits = 0
+
+    async def execute(self, statement):
+        return FakeResult(self.user)
+
+    async def commit(self):
+        self.commits += 1
+
+def login(user, password):
+    db = FakeSession(user)
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.dependency_overrides[get_db] = lambda: db
+    response = TestClient(app).post("/auth/login", json={"email": user.email, "password": password})
+    return response, db
+
+def make_user(hashed_password):
+    return models.User(
+        id=1,
+        username="user",
+        email="user@example.com",
+        hashed_password=hashed_password,
+        is_active=True,
+        is_admin=False
+    )
+
+def test_hashing_queue_rejects_when_full(monkeypatch):
+    monkeypatch.setattr(settings, "password_hash_max_pending", 1)
+
+    async def scenario():
+        release = threading.Event()
+        # Первый вызов занимает единственное место и ждёт в пуле
+        first = asyncio.ensure_future(security._run_hashing(release.wait, 5))
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(HTTPException) as error:
+                await security._run_hashing(lambda: None)
+        finally:
+            release.set()
+            await first
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == "1"
+    assert security._hash_pending == 0
+
+def test_login_rehashes_outdated_hash():
+    legacy_rounds = 5 if settings.bcrypt_rounds == 4 else 4
+    legacy_hash = bcrypt.using(rounds=legacy_rounds).hash(PASSWORD)
+    user = make_user(legacy_hash)
+
+    response, db = login(user, PASSWORD)
+
+    assert response.status_code == 200
+    assert db.commits == 1
+    assert user.hashed_password != legacy_hash
+    assert not security.pwd_context.needs_update(user.hashed_password)
+    assert security.verify_password(PASSWORD, user.hashed_password)
+
+def test_login_keeps_current_hash():
+    current_hash = security.get_password_hash(PASSWORD)
+    user = make_user(current_hash)
+
+    response, db = login(user, PASSWORD)
+
+    assert response.status_code == 200
+    assert db.commits == 0
+    assert user.hashed_password == current_hash
+
+def test_login_with_wrong_password_does_not_rehash():
+    legacy_hash = bcrypt.using(rounds=4).hash(PASSWORD)
+    user = make_user(legacy_hash)
+
+    response, db = login(user, "wrong password")
+
+    assert response.status_code == 401
+    assert db.commits == 0
+    assert user.hashed_password == legacy_hash
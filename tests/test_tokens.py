@@ -0,0 +1,67 @@
+"""Ротация ключей JWT и кэш проверенных claims"""
+from datetime import timedelta
+import time
+import pytest
+from jose import JWTError, jwt
+from app.core import cache
+from app.core.tokens import TokenService, parse_keys
+
+ALGORITHM = "HS256"
+
+def make_service(current_kid, keys):
+    return TokenService(current_kid=current_kid, keys=keys, algorithm=ALGORITHM, cache_size=100)
+
+def test_parse_keys():
+    assert parse_keys(" old=secret1, older=secret2 ,broken,=x") == {"old": "secret1", "older": "secret2"}
+
+def test_new_tokens_use_current_kid():
+    service = make_service("k2", {"k1": "secret1", "k2": "secret2"})
+
+    token = service.encode({"sub": "user@example.com"})
+
+    assert jwt.get_unverified_header(token)["kid"] == "k2"
+    assert jwt.decode(token, "secret2", algorithms=[ALGORITHM])["sub"] == "user@example.com"
+
+def test_tokens_signed_with_previous_key_still_verify():
+    old_token = make_service("k1", {"k1": "secret1"}).encode({"sub": "user@example.com"})
+    rotated = make_service("k2", {"k1": "secret1", "k2": "secret2"})
+
+    assert rotated.decode(old_token)["sub"] == "user@example.com"
+
+def test_tokens_of_dropped_key_are_rejected():
+    old_token = make_service("k1", {"k1": "secret1"}).encode({"sub": "user@example.com"})
+    service = make_service("k2", {"k2": "secret2"})
+
+    with pytest.raises(JWTError):
+        service.decode(old_token)
+
+def test_tokens_without_kid_use_current_key():
+    token = jwt.encode({"sub": "user@example.com"}, "secret2", algorithm=ALGORITHM)
+    service = make_service("k2", {"k1": "secret1", "k2": "secret2"})
+
+    assert service.decode(token)["sub"] == "user@example.com"
+
+def test_claims_cache_expires_with_token(monkeypatch):
+    service = make_service("k1", {"k1": "secret1"})
+    token = service.encode({"sub": "user@example.com"}, timedelta(minutes=5))
+
+    claims = service.decode(token)
+    assert service.claims.get(token) == claims
+    # Изменение результата не портит закэшированные claims
+    claims["sub"] = "changed"
+    assert service.decode(token)["sub"] == "user@example.com"
+
+    now = time.monotonic()
+    ttl = jwt.get_unverified_claims(token)["exp"] - time.time()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + ttl - 5)
+    assert service.claims.get(token) is not None
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + ttl + 5)
+    assert service.claims.get(token) is None
+
+def test_expired_tokens_are_not_cached():
+    service = make_service("k1", {"k1": "secret1"})
+    token = service.encode({"sub": "user@example.com"}, timedelta(seconds=-1))
+
+    with pytest.raises(JWTError):
+        service.decode(token)
+    assert service.claims.get(token) is None